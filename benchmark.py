@@ -0,0 +1,328 @@
+"""
+Performance benchmarks for the MLQ optimizer.
+
+    python benchmark.py startup [--budget-ms 500] [--json startup.json]
+    python benchmark.py run [--backends tf,numpy,fallback] [--max-batch 1000000]
+                            [--json bench.json] [--baseline base.json] [--threshold 0.25]
+                            [--noise-floor-ms 1]
+
+'startup' imports each entry point in a fresh interpreter under
+`python -X importtime`, reports the cumulative import time, and fails when
+a budget is exceeded or a heavy dependency is imported eagerly.
+
+'run' measures predict_q latency/throughput per backend for batch sizes
+1..1e6, optimize_compute per method, and the rendering time of each headless
+plot, with the peak RSS of each section (every section runs in its own
+interpreter, on CPU, with the bundled .keras and scaler files). With
+--baseline, timings more than --threshold (and more than --noise-floor-ms)
+slower than the stored run are reported as regressions and the exit code is 1.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# module -> heavy packages it must not import just by being imported
+STARTUP_TARGETS = {
+    'model_wrapper': ('tensorflow', 'keras', 'pandas', 'matplotlib', 'sklearn', 'joblib'),
+    'optimizer': ('tensorflow', 'keras', 'pandas', 'matplotlib'),
+    'main': ('tensorflow', 'keras', 'pandas', 'matplotlib', 'PyQt5', 'sklearn'),
+}
+DEFAULT_STARTUP_BUDGET_MS = 500.0
+STARTUP_REPEATS = 3
+
+BENCH_MODEL = os.path.join(HERE, 'best_model_3_Meta_raw_data.keras')
+BENCH_SCALER_X = os.path.join(HERE, 'scaler_x.pkl')
+BENCH_SCALER_Y = os.path.join(HERE, 'scaler_y.pkl')
+# backend names may carry '-folded' (scalers folded into the weights), '-float32'
+# and '-bf16'/'-int8' (NumPy weight quantization), e.g. 'numpy-folded-float32';
+# 'tf-xla' compiles the TensorFlow inference function with XLA
+BENCH_BACKENDS = ('tf', 'numpy', 'numpy-folded', 'numpy-folded-float32', 'fallback')
+BATCH_SIZES = (1, 10, 100, 1000, 10000, 100000, 1000000)
+# keep repeating a measurement until this much time is spent (best time is reported);
+# the repeat cap only binds for sub-millisecond calls
+MIN_BENCH_SECONDS = 0.3
+MAX_REPEATS = 200
+DEFAULT_REGRESSION_THRESHOLD = 0.25
+# slowdowns smaller than this are timer/scheduler noise, whatever their relative size
+DEFAULT_NOISE_FLOOR_S = 1e-3
+# design used by every timed call
+BENCH_DESIGN = {'freq': 400.0, 'R': 6.0, 'Lg': 3.0, 'Ll': 2.0}
+
+
+def parse_importtime(stderr):
+    """{module: (self_us, cumulative_us)} from `python -X importtime` output."""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        name = parts[2].strip()
+        times[name] = (int(parts[0]), int(parts[1]))
+    return times
+
+
+def measure_startup(module, heavy=(), repeats=STARTUP_REPEATS):
+    """Best-of-N cumulative import time of module, plus any heavy modules it loaded."""
+    code = ('import sys, json; import {0}; '
+            'print(json.dumps(sorted(m for m in {1!r} if m in sys.modules)))').format(module, tuple(heavy))
+    best = None
+    for _ in range(max(int(repeats), 1)):
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=HERE,
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError("Importing %s failed:\n%s" % (module, proc.stderr[-2000:]))
+        times = parse_importtime(proc.stderr)
+        cumulative_ms = times.get(module, (0, 0))[1] / 1000.0
+        if best is None or cumulative_ms < best['import_ms']:
+            top = sorted(times.items(), key=lambda kv: -kv[1][1])
+            best = {
+                'module': module,
+                'import_ms': cumulative_ms,
+                'heavy_loaded': json.loads(proc.stdout.strip().splitlines()[-1]),
+                'slowest': [[name, t[1] / 1000.0] for name, t in top[:8]],
+            }
+    return best
+
+
+def run_startup(budget_ms=DEFAULT_STARTUP_BUDGET_MS, targets=None):
+    results = [measure_startup(m, heavy) for m, heavy in (targets or STARTUP_TARGETS).items()]
+    problems = []
+    for r in results:
+        if r['heavy_loaded']:
+            problems.append('%s eagerly imports %s' % (r['module'], ', '.join(r['heavy_loaded'])))
+        if r['import_ms'] > budget_ms:
+            problems.append('%s import took %.1f ms (budget %.1f ms)' % (r['module'], r['import_ms'], budget_ms))
+    return {'startup': results, 'budget_ms': budget_ms, 'problems': problems}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where `resource` is unavailable)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+
+
+def time_call(fn, min_seconds=MIN_BENCH_SECONDS, max_repeats=MAX_REPEATS):
+    """Best wall time of fn() after one warm-up call."""
+    fn()
+    best = None
+    spent = 0.0
+    for _ in range(max(int(max_repeats), 1)):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        spent += elapsed
+        if spent >= min_seconds:
+            break
+    return best
+
+
+def make_model(backend, table=None):
+    from model_wrapper import MLQModel
+    if backend == 'fallback':
+        return MLQModel()
+    if backend == 'lut':
+        return MLQModel(table, backend='lut')
+    parts = backend.split('-')
+    quantize = [p for p in parts if p in ('bf16', 'int8')]
+    model = MLQModel(BENCH_MODEL, BENCH_SCALER_X, BENCH_SCALER_Y, backend=parts[0], fold_scalers='folded' in parts,
+                     dtype='float32' if 'float32' in parts else 'float64', quantize=quantize[0] if quantize else None,
+                     xla='xla' in parts)
+    if model.model is None:
+        raise RuntimeError("Could not load the bundled model with backend %s" % backend)
+    return model
+
+
+def bench_inference(backend, batch_sizes=BATCH_SIZES, table=None):
+    """predict_q over a trace-width array of each batch size."""
+    import numpy as np
+    model = make_model(backend, table)
+    d = BENCH_DESIGN
+    records = {}
+    for n in batch_sizes:
+        tw = np.linspace(0.1, 10.0, int(n)) if n > 1 else 2.0
+        seconds = time_call(lambda: model.predict_q(tw, d['freq'], d['R'], d['Lg'], d['Ll']))
+        records['predict_q/%s/%d' % (backend, n)] = {
+            'seconds': seconds,
+            'latency_ms': seconds * 1000.0,
+            'rows_per_s': n / seconds if seconds > 0 else None,
+        }
+    return records
+
+
+def bench_optimize(backend, table=None):
+    """End-to-end optimize_compute (including the result summary) per method."""
+    from optimizer import optimize_compute, METHODS
+    model = make_model(backend, table)
+    d = BENCH_DESIGN
+    records = {}
+    for method in METHODS:
+        seconds = time_call(lambda: optimize_compute(model, d['freq'], d['R'], d['Lg'], d['Ll'], method=method))
+        records['optimize_compute/%s/%s' % (backend, method)] = {'seconds': seconds}
+    return records
+
+
+def bench_render(out_dir):
+    """Each headless plot, in the default and the fast fixed-layout mode."""
+    import numpy as np
+    import plotting
+    Tw = np.linspace(0.1, 10.0, 100)
+    Q = 400.0 - 9.5 * Tw
+    freq_range, i_opt = plotting.frequency_sweep(BENCH_DESIGN['freq'])
+    Q_f = 132.0 - 0.000012 * (freq_range - 400.0) ** 2
+    d = BENCH_DESIGN
+    jobs = {
+        'q_vs_tw': lambda path, fast: plotting.render_q_vs_tw(path, Tw, Q, Tw[:10], Q[:10], 10, fast=fast),
+        'q_vs_freq': lambda path, fast: plotting.render_q_vs_freq(path, freq_range, Q_f, d['freq'], Q_f[i_opt],
+                                                                  Tw[0], fast=fast),
+        'coil': lambda path, fast: plotting.render_coil(path, d['R'], d['Lg'], d['Ll'], Tw[0], fast=fast),
+    }
+    records = {}
+    for name, job in jobs.items():
+        for fast in (False, True):
+            path = os.path.join(out_dir, 'bench_%s.png' % name)
+            seconds = time_call(lambda: job(path, fast))
+            records['render/%s/%s' % (name, 'fast' if fast else 'default')] = {'seconds': seconds}
+    return records
+
+
+def _run_section(kind, backend=None, batch_sizes=BATCH_SIZES, table=None, out_dir=None):
+    if kind == 'inference':
+        records = bench_inference(backend, batch_sizes, table)
+    elif kind == 'optimize':
+        records = bench_optimize(backend, table)
+    else:
+        records = bench_render(out_dir)
+    return {'records': records, 'peak_rss_mb': peak_rss_mb()}
+
+
+def measure_section(kind, backend=None, batch_sizes=BATCH_SIZES, table=None, out_dir=None):
+    """Run one benchmark section in a fresh interpreter so its peak RSS is its own."""
+    code = ('import json, benchmark; print(json.dumps(benchmark._run_section({0!r}, {1!r}, {2!r}, {3!r}, {4!r})))'
+            .format(kind, backend, tuple(batch_sizes), table, out_dir))
+    # CPU only, and quiet TensorFlow
+    env = dict(os.environ, CUDA_VISIBLE_DEVICES='-1', TF_CPP_MIN_LOG_LEVEL='2')
+    proc = subprocess.run([sys.executable, '-c', code], cwd=HERE, capture_output=True, text=True, env=env)
+    if proc.returncode != 0:
+        raise RuntimeError("Benchmark section %s/%s failed:\n%s" % (kind, backend, proc.stderr[-2000:]))
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run_suite(backends=BENCH_BACKENDS, batch_sizes=BATCH_SIZES, table=None, render=True, out_dir=None,
+              progress=print):
+    """All sections; returns {'meta', 'results', 'peak_rss_mb'}."""
+    import numpy as np
+    results = {}
+    peaks = {}
+    sections = [(kind, b) for b in backends for kind in ('inference', 'optimize')]
+    if render:
+        sections.append(('render', None))
+    for kind, backend in sections:
+        label = kind if backend is None else '%s/%s' % (kind, backend)
+        progress('Running %s...' % label)
+        out = measure_section(kind, backend, batch_sizes, table, out_dir or HERE)
+        results.update(out['records'])
+        peaks[label] = out['peak_rss_mb']
+    meta = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'cpu_count': os.cpu_count(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    return {'meta': meta, 'results': results, 'peak_rss_mb': peaks}
+
+
+def compare(report, baseline, threshold=DEFAULT_REGRESSION_THRESHOLD, noise_floor=DEFAULT_NOISE_FLOOR_S):
+    """
+    Regression messages for timings/peaks more than threshold above the
+    baseline; a timing must also be more than noise_floor seconds slower.
+    """
+    problems = []
+    for key, rec in sorted(report['results'].items()):
+        base = baseline.get('results', {}).get(key)
+        if not (base and base.get('seconds')):
+            continue
+        if rec['seconds'] - base['seconds'] > max(base['seconds'] * threshold, noise_floor):
+            problems.append('%s: %.4g s vs baseline %.4g s (+%.0f%%)' % (
+                key, rec['seconds'], base['seconds'], 100.0 * (rec['seconds'] / base['seconds'] - 1.0)))
+    for key, mb in sorted(report['peak_rss_mb'].items()):
+        base = baseline.get('peak_rss_mb', {}).get(key)
+        if mb is not None and base and mb > base * (1.0 + threshold):
+            problems.append('%s peak RSS: %.1f MB vs baseline %.1f MB' % (key, mb, base))
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='MLQ performance benchmarks')
+    sub = parser.add_subparsers(dest='command', required=True)
+    startup = sub.add_parser('startup', help='Import-time benchmark for the entry points')
+    startup.add_argument('--budget-ms', type=float, default=DEFAULT_STARTUP_BUDGET_MS,
+                         help='Fail when an entry point takes longer than this to import')
+    startup.add_argument('--json', help='Write results to this JSON file')
+    run = sub.add_parser('run', help='Inference, optimization and rendering benchmarks')
+    run.add_argument('--backends', default=','.join(BENCH_BACKENDS),
+                     help="Comma list of %s (and 'lut' with --table)" % ', '.join(BENCH_BACKENDS))
+    run.add_argument('--max-batch', type=int, default=BATCH_SIZES[-1], help='Largest predict_q batch size')
+    run.add_argument('--table', help='Q table for the lut backend')
+    run.add_argument('--no-render', action='store_true', help='Skip the plot rendering benchmark')
+    run.add_argument('--json', help='Write results to this JSON file')
+    run.add_argument('--baseline', help='Compare against a JSON file written by an earlier run')
+    run.add_argument('--threshold', type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                     help='Relative slowdown reported as a regression')
+    run.add_argument('--noise-floor-ms', type=float, default=DEFAULT_NOISE_FLOOR_S * 1000.0,
+                     help='Ignore slowdowns smaller than this, however large relative to the baseline')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        return run_benchmarks(args)
+    report = run_startup(args.budget_ms)
+    for r in report['startup']:
+        print('%-14s %8.1f ms  heavy: %s' % (r['module'], r['import_ms'], ', '.join(r['heavy_loaded']) or '-'))
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump(report, fh, indent=2)
+    for p in report['problems']:
+        print('REGRESSION:', p)
+    return 1 if report['problems'] else 0
+
+
+def run_benchmarks(args):
+    import tempfile
+    backends = [b.strip() for b in args.backends.split(',') if b.strip()]
+    batch_sizes = [n for n in BATCH_SIZES if n <= args.max_batch]
+    with tempfile.TemporaryDirectory() as out_dir:
+        report = run_suite(backends, batch_sizes, args.table, not args.no_render, out_dir)
+    for key, rec in sorted(report['results'].items()):
+        extra = '  %12.0f rows/s' % rec['rows_per_s'] if rec.get('rows_per_s') else ''
+        print('%-44s %10.3f ms%s' % (key, rec['seconds'] * 1000.0, extra))
+    for key, mb in report['peak_rss_mb'].items():
+        print('%-44s %10s MB peak RSS' % (key, '-' if mb is None else '%.1f' % mb))
+    problems = []
+    if args.baseline:
+        with open(args.baseline) as fh:
+            problems = compare(report, json.load(fh), args.threshold, args.noise_floor_ms / 1000.0)
+        report['regressions'] = problems
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump(report, fh, indent=2)
+    for p in problems:
+        print('REGRESSION:', p)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
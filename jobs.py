@@ -0,0 +1,133 @@
+import os
+import json
+import logging
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from optimizer import grid_optimize, TW_MIN, TW_MAX, GRID_POINTS
+
+# jobs evaluated together in one predict_batch call
+DEFAULT_GROUP_SIZE = 256
+# top-k region candidates listed per result (best Q first)
+DEFAULT_MAX_CANDIDATES = 10
+FREQ_RANGE = (100.0, 800.0, 800)
+
+
+def parse_job(line):
+    """One JSONL job -> dict with float freq/R/Lg/Ll, topk and optional out_prefix."""
+    raw = json.loads(line)
+    if not isinstance(raw, dict):
+        raise ValueError("job must be a JSON object")
+    job = {k: float(raw[k]) for k in ('freq', 'R', 'Lg', 'Ll')}
+    job['topk'] = float(raw.get('topk', 10))
+    job['out_prefix'] = raw.get('out_prefix')
+    return job
+
+
+def evaluate_group(model, jobs, max_candidates=DEFAULT_MAX_CANDIDATES):
+    """
+    Grid-optimize Tw for a list of parsed jobs with a single predict_batch call.
+    Returns (results, Q) where Q is the (n_jobs, GRID_POINTS) sweep matrix;
+    a job whose Q is NaN over the whole grid gets an error result.
+    """
+    cols = np.array([[j['freq'], j['R'], j['Lg'], j['Ll']] for j in jobs], dtype=float)
+    Tw_vals, Q, idx, Q_max, in_region = grid_optimize(model, cols, [j['topk'] for j in jobs])
+    results = []
+    for i, job in enumerate(jobs):
+        if idx[i] < 0:
+            results.append({'error': 'model returned no finite Q over the Tw grid'})
+            continue
+        q = Q[i]
+        region = np.flatnonzero(in_region[i])
+        best = region[np.argsort(-q[region], kind='stable')][:max_candidates]
+        results.append({
+            'freq': job['freq'], 'R': job['R'], 'Lg': job['Lg'], 'Ll': job['Ll'], 'topk': job['topk'],
+            'best_tw': float(Tw_vals[idx[i]]),
+            'Q_max': float(Q_max[i]),
+            'topk_count': int(region.size),
+            'candidates': [{'Tw': float(Tw_vals[k]), 'Q': float(q[k])} for k in best],
+        })
+    return results, Q
+
+
+def run_jobs(model, in_path, out_path, plots=False, plot_prefix='job', plot_workers=None,
+             group_size=DEFAULT_GROUP_SIZE, max_candidates=DEFAULT_MAX_CANDIDATES, plot_dpi=150, fast_plots=False):
+    """
+    Evaluate a JSONL file of optimize jobs (freq, R, Lg, Ll, optional topk and
+    out_prefix) in vectorized groups and write one JSON result per line, in
+    input order. With plots=True the three headless PNGs of each job are
+    rendered by a separate process pool while numeric work continues
+    (plot_dpi and fast_plots are passed to save_headless_plots).
+    Returns the number of jobs that succeeded.
+    """
+    group_size = max(int(group_size), 1)
+    pool = None
+    if plots:
+        # matplotlib is only needed (and imported) when plotting
+        from plotting import save_headless_plots
+        pool = ProcessPoolExecutor(max_workers=plot_workers)
+    plot_futures = []
+    n_ok = 0
+    Tw_vals = np.linspace(TW_MIN, TW_MAX, GRID_POINTS)
+    freq_range = np.linspace(*FREQ_RANGE)
+
+    def flush(group, out):
+        nonlocal n_ok
+        jobs = [job for _, job in group if isinstance(job, dict)]
+        results, Q = evaluate_group(model, jobs, max_candidates) if jobs else ([], None)
+        results = iter(enumerate(results))
+        done = []
+        for line_no, job in group:
+            if isinstance(job, dict):
+                # k indexes the job's row of Q
+                k, res = next(results)
+                res = dict(res, line=line_no)
+                n_ok += 'error' not in res
+            else:
+                k, res = None, {'line': line_no, 'error': job}
+            done.append((k, job, res))
+        ok = [(k, job, res) for k, job, res in done if 'error' not in res]
+        if pool is not None and ok:
+            # frequency curves for the whole group in one more batched call
+            Q_f = model.predict_batch(
+                trace_width=np.array([r['best_tw'] for _, _, r in ok])[:, None],
+                frequency=freq_range[None, :],
+                R=np.array([j['R'] for _, j, _ in ok])[:, None],
+                Lg=np.array([j['Lg'] for _, j, _ in ok])[:, None],
+                Ll=np.array([j['Ll'] for _, j, _ in ok])[:, None])
+            for n, (k, job, res) in enumerate(ok):
+                prefix = job['out_prefix'] or '%s_%d' % (plot_prefix, res['line'])
+                region = Q[k] >= res['Q_max'] * (1 - job['topk'] / 100.0)
+                # the optimized point is the grid maximum already found
+                plot_futures.append(pool.submit(
+                    save_headless_plots, prefix, Tw_vals, Q[k], Tw_vals[region], Q[k][region],
+                    res['best_tw'], job['freq'], job['R'], job['Lg'], job['Ll'], job['topk'],
+                    freq_range, Q_f[n], res['Q_max'], dpi=plot_dpi, fast=fast_plots))
+                res['plots'] = [os.path.abspath(prefix + s) for s in ('_q_vs_tw.png', '_q_vs_freq.png', '_coil.png')]
+        for _, _, res in done:
+            out.write(json.dumps(res) + '\n')
+        out.flush()
+
+    try:
+        with open(in_path) as fh, open(out_path, 'w') as out:
+            group = []
+            for line_no, line in enumerate(fh, 1):
+                if not line.strip():
+                    continue
+                try:
+                    group.append((line_no, parse_job(line)))
+                except (KeyError, ValueError, TypeError) as e:
+                    group.append((line_no, '%s: %s' % (type(e).__name__, e)))
+                if len(group) >= group_size:
+                    flush(group, out)
+                    group = []
+            if group:
+                flush(group, out)
+        for fut in plot_futures:
+            try:
+                fut.result()
+            except Exception as e:
+                logging.warning("Plot rendering failed: %s", e)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return n_ok
@@ -0,0 +1,188 @@
+import json
+import logging
+import itertools
+import numpy as np
+
+# feature order of the table axes, same as the model inputs
+TABLE_AXES = ('freq', 'R', 'Lg', 'Ll', 'Tw')
+DEFAULT_TABLE_AXES = {
+    'freq': (100.0, 800.0, 36),
+    'R': (2.0, 12.0, 11),
+    'Lg': (1.0, 6.0, 11),
+    'Ll': (1.0, 10.0, 10),
+    'Tw': (0.1, 10.0, 34),
+}
+DEFAULT_CHECK_SAMPLES = 20000
+# rows per interpolation pass in QTable.predict
+DEFAULT_LUT_BATCH = 65536
+
+
+def meta_path(path):
+    """Sidecar JSON holding the axes and error statistics of a table .npy."""
+    return path[:-4] + '.json' if path.endswith('.npy') else path + '.json'
+
+
+class QTable:
+    """
+    Q factor tabulated on a 5-D tensor grid (freq, R, Lg, Ll, Tw) and answered
+    by multilinear interpolation. Axes may be non-uniform. Inputs outside the
+    grid are clamped to its edge. Loaded tables are memory-mapped read-only,
+    so processes opening the same file share its pages.
+    """
+
+    def __init__(self, axes, values, error=None):
+        self.axes = [np.asarray(a, dtype=float) for a in axes]
+        if len(self.axes) != len(TABLE_AXES):
+            raise ValueError("Expected %d axes, got %d" % (len(TABLE_AXES), len(self.axes)))
+        for name, a in zip(TABLE_AXES, self.axes):
+            if a.ndim != 1 or a.size == 0 or np.any(np.diff(a) <= 0):
+                raise ValueError("Axis %s must be a non-empty increasing 1-D array" % name)
+        self.shape = tuple(a.size for a in self.axes)
+        if tuple(values.shape) != self.shape:
+            raise ValueError("Table shape %s does not match axes %s" % (values.shape, self.shape))
+        self.values = values
+        self._flat = values.reshape(-1)
+        self._strides = np.array([int(np.prod(self.shape[k + 1:])) for k in range(len(self.shape))])
+        # filled by check_error / read from the sidecar
+        self.error = dict(error or {})
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        with open(meta_path(path)) as fh:
+            meta = json.load(fh)
+        values = np.load(path, mmap_mode=mmap_mode)
+        return cls([meta['axes'][name] for name in TABLE_AXES], values, meta.get('error'))
+
+    def save_meta(self, path, **extra):
+        meta = dict(extra, axes={name: a.tolist() for name, a in zip(TABLE_AXES, self.axes)},
+                    shape=list(self.shape), dtype=str(self.values.dtype), error=self.error)
+        with open(meta_path(path), 'w') as fh:
+            json.dump(meta, fh, indent=2)
+
+    def _locate(self, X):
+        """Per-axis lower/upper flat offsets and interpolation weights for the rows of X."""
+        lo, hi, t = [], [], []
+        for k, a in enumerate(self.axes):
+            x = np.clip(X[:, k], a[0], a[-1])
+            if a.size == 1:
+                i = np.zeros(x.shape, dtype=np.intp)
+                lo.append(i)
+                hi.append(i)
+                t.append(np.zeros(x.shape))
+                continue
+            i = np.clip(np.searchsorted(a, x, side='right') - 1, 0, a.size - 2)
+            lo.append(i * self._strides[k])
+            hi.append((i + 1) * self._strides[k])
+            t.append((x - a[i]) / (a[i + 1] - a[i]))
+        return lo, hi, t
+
+    def predict(self, X, verbose=0, batch_size=None):
+        """Interpolated Q for an (n, 5) array of raw [freq, R, Lg, Ll, Tw] rows."""
+        X = np.asarray(X, dtype=float)
+        n = X.shape[0]
+        batch_size = max(int(batch_size or DEFAULT_LUT_BATCH), 1)
+        out = np.empty(n, dtype=float)
+        for start in range(0, n, batch_size):
+            lo, hi, t = self._locate(X[start:start + batch_size])
+            acc = np.zeros(t[0].shape)
+            # sum over the 2**5 cell corners
+            for corner in itertools.product((0, 1), repeat=len(self.axes)):
+                idx = np.zeros(t[0].shape, dtype=np.intp)
+                w = np.ones(t[0].shape)
+                for k, c in enumerate(corner):
+                    if c:
+                        idx += hi[k]
+                        w *= t[k]
+                    else:
+                        idx += lo[k]
+                        w *= 1.0 - t[k]
+                acc += w * self._flat[idx]
+            out[start:start + acc.shape[0]] = acc
+        return out
+
+    __call__ = predict
+
+    def check_error(self, model, n_samples=DEFAULT_CHECK_SAMPLES, seed=0):
+        """
+        Compare the table with model.predict_batch at random points inside
+        the grid and at random cell centres (where multilinear error peaks).
+        Stores and returns max/mean absolute and max relative error.
+        """
+        rng = np.random.default_rng(seed)
+        n_rand = n_samples // 2
+        X = np.column_stack([rng.uniform(a[0], a[-1], n_rand) for a in self.axes])
+        centres = []
+        for a in self.axes:
+            if a.size == 1:
+                centres.append(np.full(n_samples - n_rand, a[0]))
+            else:
+                i = rng.integers(0, a.size - 1, n_samples - n_rand)
+                centres.append(0.5 * (a[i] + a[i + 1]))
+        X = np.vstack([X, np.column_stack(centres)])
+        ref = model.predict_batch(X)
+        err = np.abs(self.predict(X) - ref)
+        self.error = {
+            'samples': int(X.shape[0]),
+            'max_abs': float(err.max()),
+            'mean_abs': float(err.mean()),
+            'max_rel': float((err / np.maximum(np.abs(ref), 1e-12)).max()),
+        }
+        return self.error
+
+
+def refine_axes(model, axes, tol, max_rounds=3, probe=256, seed=0):
+    """
+    Adaptive (still tensor-product) grid: per axis, insert the midpoint of
+    every interval where linear interpolation along that axis misses the
+    model by more than tol at any of `probe` random settings of the other
+    axes. Repeats up to max_rounds times; returns the refined axes.
+    """
+    rng = np.random.default_rng(seed)
+    axes = [np.asarray(a, dtype=float) for a in axes]
+    for _ in range(max_rounds):
+        changed = False
+        for k in range(len(axes)):
+            a = axes[k]
+            if a.size < 2:
+                continue
+            # probe rows for the other axes, crossed with the interval ends and midpoints
+            others = np.column_stack([rng.choice(b, probe) for b in axes])
+            pts = np.concatenate([a, 0.5 * (a[:-1] + a[1:])])
+            X = np.repeat(others, pts.size, axis=0)
+            X[:, k] = np.tile(pts, probe)
+            Q = model.predict_batch(X).reshape(probe, pts.size)
+            ends, mids = Q[:, :a.size], Q[:, a.size:]
+            err = np.abs(mids - 0.5 * (ends[:, :-1] + ends[:, 1:])).max(axis=0)
+            bad = err > tol
+            if bad.any():
+                axes[k] = np.sort(np.concatenate([a, 0.5 * (a[:-1] + a[1:])[bad]]))
+                changed = True
+        if not changed:
+            break
+    return axes
+
+
+def build_table(model, axes, out_path, dtype=np.float32, check_samples=DEFAULT_CHECK_SAMPLES,
+                progress=None):
+    """
+    Tabulate model.predict_batch over the tensor grid of axes (freq, R, Lg,
+    Ll, Tw) into out_path (.npy, written through a memmap one frequency
+    slice at a time) plus its sidecar JSON, then measure the interpolation
+    error against the model. Returns the QTable, opened read-only.
+    """
+    axes = [np.asarray(a, dtype=float) for a in axes]
+    shape = tuple(a.size for a in axes)
+    values = np.lib.format.open_memmap(out_path, mode='w+', dtype=dtype, shape=shape)
+    R, Lg, Ll, Tw = np.meshgrid(*axes[1:], indexing='ij')
+    for i, f in enumerate(axes[0]):
+        values[i] = model.predict_batch(trace_width=Tw, frequency=f, R=R, Lg=Lg, Ll=Ll)
+        if progress is not None:
+            progress('Tabulated %d/%d frequency slices' % (i + 1, shape[0]))
+    values.flush()
+    del values
+    table = QTable(axes, np.load(out_path, mmap_mode='r'))
+    if check_samples:
+        table.check_error(model, check_samples)
+        logging.info("Q table error vs model: %s", table.error)
+    table.save_meta(out_path, model_path=getattr(model, 'model_path', None))
+    return table
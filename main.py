@@ -1,175 +1,131 @@
 import sys
 import os
 import argparse
+import multiprocessing
 import platform
-import pandas as pd
 import numpy as np
-import matplotlib
-import matplotlib.pyplot as plt
-from matplotlib.patches import Polygon as MPolygon, PathPatch, Rectangle
-from matplotlib.path import Path
-from model_wrapper import MLQModel
-
-MODEL_PATH = r"D:\mlq_desktop\best_model_3_Meta_raw_data.keras"
-SCALER_X_PATH = r"D:\mlq_desktop\scaler_x.pkl"
-SCALER_Y_PATH = r"D:\mlq_desktop\scaler_y.pkl"
-
-def optimize_compute(model, freq, R, Lg, Ll, topk_percent=10):
-    Tw_vals = np.linspace(0.1, 10.0, 100)
-    Q_vals = model.predict_q(Tw_vals, freq, R, Lg, Ll)
-    idx_max = int(np.nanargmax(Q_vals))
-    Q_max = float(Q_vals[idx_max])
-    best_tw = float(Tw_vals[idx_max])
-    df = pd.DataFrame({'Tw [mm]': Tw_vals, 'Q': Q_vals})
-    threshold = Q_max * (1 - float(topk_percent) / 100.0)
-    top_k_df = df[df['Q'] >= threshold].copy()
-    result_text = f"Best Design:\nTw = {best_tw:.4f} mm\nMax Q = {Q_max:.4f}\n"
-    result_text += f"\nTop-{float(topk_percent):.0f}% Region Candidates: {len(top_k_df)}\n"
-    result_text += top_k_df.head().to_string(index=False)
-
-    return {
-        'Tw_vals': Tw_vals,
-        'Q_vals': Q_vals,
-        'best_tw': best_tw,
-        'Q_max': Q_max,
-        'top_k_df': top_k_df,
-        'result_text': result_text
+import profiling
+from model_wrapper import MLQModel, BACKENDS, DTYPES
+from numpy_backend import QUANTIZE_MODES
+from optimizer import optimize_compute, optimize_geometry, optimize_band, sensitivity, METHODS, ROBUST_OBJECTIVES
+from sweep import run_sweep, parse_axis, DEFAULT_SHARD_SIZE
+from jobs import run_jobs, DEFAULT_GROUP_SIZE
+from lut import DEFAULT_TABLE_AXES, DEFAULT_CHECK_SAMPLES
+from registry import ModelRegistry, default_paths, DEFAULT_MODEL_NAME, DEFAULT_CHECK_INTERVAL
+from server import run_server, run_replay, DEFAULT_HOST, DEFAULT_PORT, DEFAULT_MAX_BATCH, DEFAULT_MAX_WAIT_MS
+
+# $MLQ_MODEL_DIR, the PyInstaller bundle or the app directory (--model-dir overrides)
+MODEL_PATH, SCALER_X_PATH, SCALER_Y_PATH = default_paths()
+# predict_q results kept by the GUI model; repeated sweeps/lookups become cache hits
+GUI_CACHE_SIZE = 128
+# live mode: recompute this long after the last input change
+LIVE_DEBOUNCE_MS = 250
+
+def model_kwargs(args, **extra):
+    """MLQModel keyword arguments for the backend chosen on the command line."""
+    model_path, scaler_x_path, scaler_y_path = (default_paths(args.model_dir) if args.model_dir
+                                                else (MODEL_PATH, SCALER_X_PATH, SCALER_Y_PATH))
+    kwargs = {
+        'model_path': args.table if args.backend == 'lut' else model_path,
+        'scaler_x_path': scaler_x_path,
+        'scaler_y_path': scaler_y_path,
+        'backend': args.backend,
+        'fold_scalers': args.fold_scalers,
+        'dtype': args.dtype,
+        'quantize': args.quantize,
+        'xla': args.xla,
     }
+    kwargs.update(extra)
+    return kwargs
 
 def run_headless(args):
     print('Running in headless mode (no GUI)')
     print('Python:', sys.executable)
     print('Platform:', platform.platform())
-    model = MLQModel(MODEL_PATH, SCALER_X_PATH, SCALER_Y_PATH)
+    model = MLQModel(**model_kwargs(args))
     freq = float(args.freq)
     R = float(args.R)
     Lg = float(args.Lg)
     Ll = float(args.Ll)
     topk = int(args.topk)
-    res = optimize_compute(model, freq, R, Lg, Ll, topk)
-    print(res['result_text'])
-    matplotlib.use('Agg')
-
-    # Plot 1
-    fig1, ax = plt.subplots(figsize=(6, 4), dpi=150)
-    top_k_df = res['top_k_df']
-    if not top_k_df.empty:
-        ax.plot(top_k_df['Tw [mm]'], top_k_df['Q'], marker='o', linestyle='-', color='blue')
+    if args.optimize_geometry:
+        with profiling.stage('optimize_geometry'):
+            geo = optimize_geometry(model, freq, seed=0, polish=args.optimizer == 'gradient')
+        print(geo['result_text'])
+        # continue with the best geometry found
+        R, Lg, Ll = geo['best']['R'], geo['best']['Lg'], geo['best']['Ll']
+    from plotting import save_headless_plots, frequency_sweep
+    if args.band:
+        lo, hi, num = (args.band.split(':') + ['41'])[:3]
+        if not float(lo) <= freq <= float(hi):
+            freq = 0.5 * (float(lo) + float(hi))
+        # the marker frequency is part of the band grid
+        freq_range, i_opt = frequency_sweep(freq, float(lo), float(hi), int(num))
+        tolerance = [float(t) for t in str(args.tolerance).split(',')]
+        res = optimize_band(model, freq_range, R, Lg, Ll, tolerance=tolerance, objective=args.robust,
+                            topk_percent=topk, n_random=args.perturb_samples)
+        print(res['band_text'])
+        # curve and marker come from the same batched evaluation
+        Q_f = res['Q_f']
     else:
-        ax.plot(res['Tw_vals'], res['Q_vals'], marker='o', linestyle='-', color='blue')
-    ax.set_xlabel('Trace Width (Tw) [mm]')
-    ax.set_ylabel('Q Factor')
-    ax.set_title(f"Top-{float(topk):.0f}% Designs")
-    ax.grid(True)
-    out1 = os.path.abspath(args.out_prefix + '_q_vs_tw.png')
-    fig1.tight_layout(pad=0.5)
-    fig1.savefig(out1, bbox_inches='tight')
-    plt.close(fig1)
-
-    # Plot 2
-    fig2, ax2 = plt.subplots(figsize=(6, 4), dpi=150)
-    freq_range = np.linspace(100.0, 800.0, 800)
-    Q_f = model.predict_q(res['best_tw'], freq_range, R, Lg, Ll)
-    ax2.plot(freq_range, Q_f, '-', label=f'Q vs Frequency @ Tw={res["best_tw"]:.3f}')
-    ax2.axvline(freq, color='gray', linestyle='--', label='Input Frequency')
-    ax2.plot([freq], [float(model.predict_q(res['best_tw'], freq, R, Lg, Ll))], 'o', color='blue', markersize=7, label='Optimized Point')
-    ax2.set_xlabel('Frequency [MHz]')
-    ax2.set_ylabel('Q Factor')
-    ax2.set_title('Q vs Frequency')
-    ax2.grid(True)
-    ax2.legend()
-    out2 = os.path.abspath(args.out_prefix + '_q_vs_freq.png')
-    fig2.tight_layout(pad=0.5)
-    fig2.savefig(out2, bbox_inches='tight')
-    plt.close(fig2)
-
-    # Coil diagram 
-    fig3, ax3 = plt.subplots(figsize=(6, 4), dpi=150)
-    render_coil_axes(ax3, R, Lg, Ll, res['best_tw'])
-    out3 = os.path.abspath(args.out_prefix + '_coil.png')
-    fig3.tight_layout(pad=0.5)
-    fig3.savefig(out3, bbox_inches='tight')
-    plt.close(fig3)
+        res = optimize_compute(model, freq, R, Lg, Ll, topk, method=args.optimizer, tol=float(args.tol))
+        # the input frequency is part of the sweep, so the marker needs no extra model call
+        freq_range, i_opt = frequency_sweep(freq)
+        Q_f = model.predict_q(res['best_tw'], freq_range, R, Lg, Ll)
+    print(res['result_text'])
+    if args.sensitivity:
+        print(sensitivity(model, freq, R, Lg, Ll, res['best_tw'])['text'])
+    Q_opt = float(Q_f[i_opt])
+    executor = None
+    plot_workers = args.plot_workers or 1
+    if plot_workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=min(plot_workers, 3))
+    try:
+        out1, out2, out3 = save_headless_plots(
+            args.out_prefix, res.Tw_vals, res.Q_vals, res.top_tw, res.top_q,
+            res['best_tw'], freq, R, Lg, Ll, topk, freq_range, Q_f, Q_opt,
+            dpi=args.dpi, fast=args.fast_plots, executor=executor, Q_f_worst=res.get('Q_f_worst'))
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
     print('Saved plots:')
     print(' -', out1)
     print(' -', out2)
     print(' -', out3)
 
-def render_coil_axes(ax, R, Lg, Ll, Tw):
-    """coil geometry: complete circle on top + two separate vertical legs extending down.
-    """
-    x_left = -Lg / 2.0
-    x_right = Lg / 2.0
-    n_circle = 400
-    theta_circle = np.linspace(0, 2*np.pi, n_circle)
-    circle_x = R * np.cos(theta_circle)
-    circle_y = R * np.sin(theta_circle)
-    notch_h = max(R * 0.15, Tw * 10.0)
-    leg_w = max(Tw * 30.0, 2.5)
-    if abs(x_left) < R:
-        y_attach = -np.sqrt(max(R**2 - x_left**2, 0.0))
+def _sweep_option(args, name):
+    """sweep's own --<name>, else the global one given before the subcommand."""
+    value = getattr(args, 'sweep_' + name)
+    return getattr(args, name) if value is None else value
+
+def run_sweep_command(args):
+    if args.scenarios:
+        axes = None
     else:
-        y_attach = -R
-    notch_top = y_attach
-    notch_bottom = notch_top - notch_h
-    pad = 0.2
-    mask = ~((circle_x >= (x_left - leg_w/2.0 - pad)) & (circle_x <= (x_right + leg_w/2.0 + pad)) & (circle_y <= notch_top))
-    circle_x_filtered = circle_x[mask]
-    circle_y_filtered = circle_y[mask]
-    line_width = max(Tw * 30, 2.0)
-    ax.plot(circle_x_filtered, circle_y_filtered, color='#333333', linewidth=line_width, solid_capstyle='round',
-            solid_joinstyle='round', zorder=2)
-
-    left_rect = Rectangle((x_left - leg_w/2.0, notch_top - Ll), leg_w, Ll, facecolor='#333333', edgecolor='none', zorder=2)
-    right_rect = Rectangle((x_right - leg_w/2.0, notch_top - Ll), leg_w, Ll, facecolor='#333333', edgecolor='none', zorder=2)
-    ax.add_patch(left_rect)
-    ax.add_patch(right_rect)
-    cover_h = max(0.6, notch_h * 0.6)
-    cover = Rectangle((x_left - leg_w, notch_top - cover_h/2.0), (x_right + leg_w) - (x_left - leg_w), cover_h,
-                     facecolor='white', edgecolor='none', zorder=10)
-    ax.add_patch(cover)
-    ax.plot(circle_x_filtered, circle_y_filtered, color='black', linewidth=1.6, solid_capstyle='round',
-            solid_joinstyle='round', zorder=4)
-
-    # left leg sides
-    ax.plot([x_left - leg_w/2.0, x_left - leg_w/2.0], [notch_top - Ll, notch_top - 0.01], color='black', linewidth=1.2, zorder=4)
-    ax.plot([x_left + leg_w/2.0, x_left + leg_w/2.0], [notch_top - Ll, notch_top - 0.01], color='black', linewidth=1.2, zorder=4)
-
-    # right leg sides
-    ax.plot([x_right - leg_w/2.0, x_right - leg_w/2.0], [notch_top - Ll, notch_top - 0.01], color='black', linewidth=1.2, zorder=4)
-    ax.plot([x_right + leg_w/2.0, x_right + leg_w/2.0], [notch_top - Ll, notch_top - 0.01], color='black', linewidth=1.2, zorder=4)
-    
-    # Dimension labels
-    # R: radius label with dashed line to right side of circle (at top)
-    ax.plot([0, R*0.85], [R*0.5, R*0.5], color='#FFD700', linestyle='--', linewidth=1.5, alpha=0.7, zorder=1)
-    ax.text(R*0.95, R*0.7, f'R={R:.1f}', fontsize=10, color='#FFD700', fontweight='bold', zorder=4)
-    
-    # Lg: gap label at bottom of legs with dimension line
-    leg_bottom = -R - Ll
-    ax.plot([x_left, x_right], [leg_bottom - 0.3, leg_bottom - 0.3], color='#A22B43', linewidth=1.2, alpha=0.7, zorder=1)
-    ax.text(0, leg_bottom - 0.6, f'Lg={Lg:.1f} mm', fontsize=10, color='#A22B43', fontweight='bold', 
-            ha='center', zorder=4)
-    
-    # Ll: leg length label on left side
-    leg_mid = (-R + (-R - Ll)) / 2
-    ax.text(x_left - 0.8, leg_mid, f'Ll={Ll:.1f} mm', fontsize=10, color='#4CAF50', fontweight='bold', 
-            ha='right', va='center', zorder=4)
-    
-    # Tw: trace width label on right side
-    ax.text(x_right + 0.8, leg_mid, f'Tw={Tw:.3f} mm', fontsize=10, color='#9C27B0', fontweight='bold', 
-            ha='left', va='center', zorder=4)
-    
-    # Tw: trace width label on right side
-    ax.text(x_right + 0.8, -Ll / 2, f'Tw={Tw:.3f} mm', fontsize=10, color='purple', fontweight='bold', 
-            ha='left', va='center', zorder=4)
-    
-    # Layout
-    ax.set_xlim(-R*1.3, R*1.4)
-    ax.set_ylim(-Ll - 0.8, R + 0.5)
-    ax.set_aspect('equal')
-    ax.set_title('PCB Single Turn Tx Coil Geometry (mm)', fontsize=11, fontweight='bold')
-    ax.axis('off')
+        axes = [parse_axis(_sweep_option(args, name)) for name in ('freq', 'R', 'Lg', 'Ll')]
+        print('Grid size:', int(np.prod([len(a) for a in axes])))
+    topk = int(_sweep_option(args, 'topk'))
+    run_sweep(args.out, model_kwargs(args), axes=axes, scenarios_csv=args.scenarios, topk_percent=topk,
+              method=args.optimizer, tol=float(args.tol), workers=args.workers, shard_size=args.shard_size,
+              resume=not args.no_resume)
+    print('Saved sweep results:', os.path.abspath(args.out))
+
+def run_table_command(args):
+    if args.backend == 'lut':
+        raise SystemExit('table: build from the network (--backend tf or numpy), not from another table')
+    from lut import build_table, refine_axes
+    model = MLQModel(**model_kwargs(args))
+    axes = [parse_axis(getattr(args, 'table_' + name)) for name in ('freq', 'R', 'Lg', 'Ll', 'Tw')]
+    if args.refine_tol is not None:
+        axes = refine_axes(model, axes, float(args.refine_tol))
+    print('Table shape:', tuple(len(a) for a in axes))
+    table = build_table(model, axes, args.out, dtype=args.store_dtype, check_samples=args.check_samples)
+    if table.error:
+        print('Interpolation error vs model over %(samples)d points: max %(max_abs).4g, '
+              'mean %(mean_abs).4g (max relative %(max_rel).3g)' % table.error)
+    print('Saved Q table:', os.path.abspath(args.out))
 
 # GUI mode
 def run_gui(args):
@@ -178,6 +134,7 @@ def run_gui(args):
         from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
         from matplotlib.figure import Figure
         from matplotlib.patches import Circle, Rectangle, FancyBboxPatch
+        from plotting import render_coil_axes
     except Exception as e:
         print('Failed to import PyQt5/Qt backends:', e)
         raise
@@ -193,14 +150,92 @@ def run_gui(args):
             self.setParent(parent)
             fig.tight_layout()
 
+    class BlitManager:
+        """
+        Keeps a canvas background cached and redraws only the given animated
+        artists over it; a full draw is needed when axes limits change.
+        """
+        def __init__(self, canvas, artists):
+            self.canvas = canvas
+            self.artists = list(artists)
+            self.background = None
+            for a in self.artists:
+                a.set_animated(True)
+            canvas.mpl_connect('draw_event', self.on_draw)
+
+        def on_draw(self, event):
+            self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+            self.draw_artists()
+
+        def draw_artists(self):
+            for a in self.artists:
+                self.canvas.figure.draw_artist(a)
+
+        def update(self, full=False):
+            if full or self.background is None:
+                # the draw_event handler re-captures the background
+                self.canvas.draw_idle()
+                return
+            self.canvas.restore_region(self.background)
+            self.draw_artists()
+            self.canvas.blit(self.canvas.figure.bbox)
+
+        def set_animated(self, animated):
+            for a in self.artists:
+                a.set_animated(animated)
+
+    class OptimizeWorker(QtCore.QObject):
+        """Runs the model work for one optimize request on the worker thread."""
+        finished = QtCore.pyqtSignal(int, object)
+        failed = QtCore.pyqtSignal(int, str)
+
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        @QtCore.pyqtSlot(int, object)
+        def run(self, request_id, params):
+            try:
+                freq, R, Lg, Ll, topk_percent = params
+                res = optimize_compute(self.model, freq, R, Lg, Ll, topk_percent,
+                                       method=args.optimizer, tol=float(args.tol))
+                freq_range = np.linspace(100.0, 700.0, 300)
+                res['freq_range'] = freq_range
+                res['Q_f'] = self.model.predict_q(res['best_tw'], freq_range, R, Lg, Ll)
+                # Q at (best_tw, freq) is the optimum already found
+                res['Q_opt'] = res['Q_max']
+                res['params'] = params
+                self.finished.emit(request_id, res)
+            except Exception as e:
+                self.failed.emit(request_id, str(e))
+
     class MLQApp(QtWidgets.QWidget):
+        # queued across threads to OptimizeWorker.run
+        compute_requested = QtCore.pyqtSignal(int, object)
+
         def __init__(self):
             super().__init__()
             self.setWindowTitle('MLQ: Meta Learning Based LPWPT System Tx Coil Geometry Optimization')
-            self.model = MLQModel(MODEL_PATH, SCALER_X_PATH, SCALER_Y_PATH)
+            self.model = MLQModel(**model_kwargs(args, cache_size=GUI_CACHE_SIZE))
+            # one request in flight at a time; newer requests replace the queued one
+            self._request_id = 0
+            self._in_flight = False
+            self._pending = None
+            self._worker_thread = QtCore.QThread(self)
+            self._worker = OptimizeWorker(self.model)
+            self._worker.moveToThread(self._worker_thread)
+            self.compute_requested.connect(self._worker.run)
+            self._worker.finished.connect(self.on_result)
+            self._worker.failed.connect(self.on_failed)
+            self._worker_thread.start()
             self.init_ui()
             self.setMinimumSize(1100, 700)
 
+        def closeEvent(self, event):
+            self._worker_thread.quit()
+            self._worker_thread.wait()
+            super().closeEvent(event)
+
         def init_ui(self):
             main_layout = QtWidgets.QHBoxLayout(self)
             main_layout.setContentsMargins(8, 8, 8, 8)
@@ -255,11 +290,27 @@ def run_gui(args):
             left_layout.addWidget(self.topk_label)
             self.topk_slider.valueChanged.connect(self.on_topk_changed)
 
+            self.live_checkbox = QtWidgets.QCheckBox('Live update')
+            self.live_checkbox.setChecked(True)
+            left_layout.addWidget(self.live_checkbox)
+            self._debounce = QtCore.QTimer(self)
+            self._debounce.setSingleShot(True)
+            self._debounce.setInterval(LIVE_DEBOUNCE_MS)
+            self._debounce.timeout.connect(self.on_optimize)
+            for spin in (self.freq_input, self.r_input, self.lg_input, self.ll_input):
+                spin.valueChanged.connect(self.on_input_changed)
+
             left_layout.addStretch(1)
             self.optimize_button = QtWidgets.QPushButton('Optimize')
             self.optimize_button.setFixedHeight(48)
             self.optimize_button.clicked.connect(self.on_optimize)
             left_layout.addWidget(self.optimize_button)
+            self.busy_bar = QtWidgets.QProgressBar()
+            self.busy_bar.setRange(0, 0)
+            self.busy_bar.setTextVisible(False)
+            self.busy_bar.setFixedHeight(6)
+            self.busy_bar.hide()
+            left_layout.addWidget(self.busy_bar)
             
             right_panel = QtWidgets.QFrame()
             right_layout = QtWidgets.QVBoxLayout(right_panel)
@@ -323,67 +374,143 @@ def run_gui(args):
             splitter.setSizes([320, 900])
             main_layout.addWidget(splitter, stretch=1)
             
+            self.init_plot_artists()
             self.on_optimize()
             self.save_plot1_btn.clicked.connect(self.save_plot1)
             self.save_plot2_btn.clicked.connect(self.save_plot2)
             self.save_coil_btn.clicked.connect(self.save_coil)
 
-        def on_topk_changed(self, v):
-            self.topk_label.setText(f"{v} %")
-
-        def on_optimize(self):
-            freq = float(self.freq_input.value())
-            R = float(self.r_input.value())
-            Lg = float(self.lg_input.value())
-            Ll = float(self.ll_input.value())
-            topk_percent = int(self.topk_slider.value())
-
-            res = optimize_compute(self.model, freq, R, Lg, Ll, topk_percent)
-
-            self.result_text.setText(res['result_text'])
-
-           
+        def init_plot_artists(self):
+            """Create the plot artists once; results only update their data."""
+            self._last_res = None
+            self.coil_renderer = None
             ax = self.plot1.axes
-            ax.clear()
-            top_k_df = res['top_k_df']
-            if not top_k_df.empty:
-                ax.plot(top_k_df['Tw [mm]'], top_k_df['Q'], marker='o', linestyle='-', color='blue', linewidth=2, markersize=4, label='Top-k%')
-            else:
-                ax.plot(res['Tw_vals'], res['Q_vals'], marker='o', linestyle='-', color='blue', linewidth=2, markersize=4, label='All')
-         
-            ax.axvline(res['best_tw'], color='red', linestyle='--', linewidth=1.5, label='Optimal Tw')
+            self.p1_line, = ax.plot([], [], marker='o', linestyle='-', color='blue', linewidth=2, markersize=4, label='Top-k%')
+            self.p1_vline = ax.axvline(0.0, color='red', linestyle='--', linewidth=1.5, label='Optimal Tw')
             ax.set_xlabel('Trace Width (Tw) [mm]', fontsize=8)
             ax.set_ylabel('Q Factor', fontsize=8)
             ax.set_title('Q vs Trace Width', fontsize=10, fontweight='bold')
             ax.grid(True, alpha=0.3)
-            ax.legend(loc='upper right', fontsize=6, framealpha=0.6)
-            self.plot1.figure.tight_layout()
-            self.plot1.draw()
+            self.p1_legend = ax.legend(loc='upper right', fontsize=6, framealpha=0.6)
+            self.plot1_blit = BlitManager(self.plot1, [self.p1_line, self.p1_vline, self.p1_legend])
 
- 
             ax2 = self.plot2.axes
-            ax2.clear()
-            freq_range = np.linspace(100.0, 700.0, 300)
-            Q_f = self.model.predict_q(res['best_tw'], freq_range, R, Lg, Ll)
-            ax2.plot(freq_range, Q_f, color='purple', linewidth=2.5, label=f'S-param @ Tw={res["best_tw"]:.3f}')
-            ax2.axvline(freq, color='blue', linestyle='--', linewidth=1.5, label='Input Frequency')
-            ax2.plot([freq], [self.model.predict_q(res['best_tw'], freq, R, Lg, Ll)], marker='D', markersize=8, color='red', zorder=5, label='Optimized Point')
+            self.p2_line, = ax2.plot([], [], color='purple', linewidth=2.5, label='S-param @ Tw=')
+            self.p2_vline = ax2.axvline(0.0, color='blue', linestyle='--', linewidth=1.5, label='Input Frequency')
+            self.p2_point, = ax2.plot([], [], marker='D', markersize=8, color='red', zorder=5, linestyle='none', label='Optimized Point')
             ax2.set_xlabel('Frequency (MHz)', fontsize=8)
             ax2.set_ylabel('Q Factor', fontsize=8)
             ax2.set_title('Q vs Frequency', fontsize=10, fontweight='bold')
             ax2.grid(True, alpha=0.3)
-            ax2.legend(loc='upper right', fontsize=6, framealpha=0.6)
-            self.plot2.figure.tight_layout()
-            self.plot2.draw()
+            self.p2_legend = ax2.legend(loc='upper right', fontsize=6, framealpha=0.6)
+            self.plot2_blit = BlitManager(self.plot2, [self.p2_line, self.p2_vline, self.p2_point, self.p2_legend])
+
+        def on_input_changed(self, _value=None):
+            if self.live_checkbox.isChecked():
+                # restart the debounce window on every change
+                self._debounce.start()
+
+        def on_topk_changed(self, v):
+            self.topk_label.setText(f"{v} %")
+            if self._last_res is None or not self.live_checkbox.isChecked():
+                return
+            # re-filter the cached sweep; no model calls, only plot 1 changes
+            res = self._last_res.with_topk(v)
+            self.result_text.setText(res['result_text'])
+            self.update_plot1(res)
 
+        def on_optimize(self):
+            params = (
+                float(self.freq_input.value()),
+                float(self.r_input.value()),
+                float(self.lg_input.value()),
+                float(self.ll_input.value()),
+                int(self.topk_slider.value()),
+            )
+            self._request_id += 1
+            if self._in_flight:
+                # coalesce: only the newest request waits behind the running one
+                self._pending = (self._request_id, params)
+            else:
+                self._dispatch(self._request_id, params)
+
+        def _dispatch(self, request_id, params):
+            self._in_flight = True
+            self.busy_bar.show()
+            self.optimize_button.setText('Optimizing...')
+            self.compute_requested.emit(request_id, params)
+
+        def _request_done(self):
+            self._in_flight = False
+            if self._pending is not None:
+                request_id, params = self._pending
+                self._pending = None
+                self._dispatch(request_id, params)
+            else:
+                self.busy_bar.hide()
+                self.optimize_button.setText('Optimize')
+
+        def on_failed(self, request_id, message):
+            if request_id == self._request_id:
+                self.result_text.setText(f'Optimization failed: {message}')
+            self._request_done()
+
+        def on_result(self, request_id, res):
+            # results for inputs that have since changed are dropped
+            if request_id == self._request_id:
+                self.show_result(res)
+            self._request_done()
+
+        def show_result(self, res):
+            freq, R, Lg, Ll, topk_percent = res['params']
+            self._last_res = res
+            if topk_percent != self.topk_slider.value():
+                # the slider moved while this result was computed
+                res = res.with_topk(self.topk_slider.value())
+            self.result_text.setText(res['result_text'])
+            self.update_plot1(res)
+            self.update_plot2(res, freq)
             self.draw_coil(R, Lg, Ll, res['best_tw'])
 
+        @staticmethod
+        def rescale(ax):
+            """Autoscale to the current data; True if the view limits changed."""
+            before = (ax.get_xlim(), ax.get_ylim())
+            ax.relim(visible_only=True)
+            ax.autoscale_view()
+            return before != (ax.get_xlim(), ax.get_ylim())
+
+        def update_plot1(self, res):
+            if res.top_k_count:
+                self.p1_line.set_data(res.top_tw, res.top_q)
+                self.p1_legend.get_texts()[0].set_text('Top-k%')
+            else:
+                self.p1_line.set_data(res['Tw_vals'], res['Q_vals'])
+                self.p1_legend.get_texts()[0].set_text('All')
+            self.p1_vline.set_xdata([res['best_tw'], res['best_tw']])
+            full = self.rescale(self.plot1.axes)
+            if full:
+                self.plot1.figure.tight_layout()
+            self.plot1_blit.update(full)
+
+        def update_plot2(self, res, freq):
+            self.p2_line.set_data(res['freq_range'], res['Q_f'])
+            self.p2_legend.get_texts()[0].set_text(f'S-param @ Tw={res["best_tw"]:.3f}')
+            self.p2_vline.set_xdata([freq, freq])
+            self.p2_point.set_data([freq], [res['Q_opt']])
+            full = self.rescale(self.plot2.axes)
+            if full:
+                self.plot2.figure.tight_layout()
+            self.plot2_blit.update(full)
+
         def draw_coil(self, R, Lg, Ll, Tw):
-            ax = self.coil_plot.axes
-            ax.clear()
-            render_coil_axes(ax, R, Lg, Ll, Tw)
-            self.coil_plot.figure.tight_layout()
-            self.coil_plot.draw()
+            if self.coil_renderer is None:
+                self.coil_renderer = render_coil_axes(self.coil_plot.axes, R, Lg, Ll, Tw)
+                self.coil_plot.figure.tight_layout()
+            else:
+                # move the existing artists instead of rebuilding them
+                self.coil_renderer.update(R, Lg, Ll, Tw)
+            self.coil_plot.draw_idle()
 
         def save_figure_dialog(self, fig, default_name='plot.png'):
             opts = QtWidgets.QFileDialog.Options()
@@ -396,10 +523,17 @@ def run_gui(args):
                     QtWidgets.QMessageBox.critical(self, 'Error', f'Failed to save: {e}')
 
         def save_plot1(self):
+            # savefig skips animated artists, so make them static while saving
+            self.plot1_blit.set_animated(False)
             self.save_figure_dialog(self.plot1.figure, 'plot_q_vs_tw.png')
+            self.plot1_blit.set_animated(True)
+            self.plot1_blit.update(full=True)
 
         def save_plot2(self):
+            self.plot2_blit.set_animated(False)
             self.save_figure_dialog(self.plot2.figure, 'plot_q_vs_freq.png')
+            self.plot2_blit.set_animated(True)
+            self.plot2_blit.update(full=True)
 
         def save_coil(self):
             self.save_figure_dialog(self.coil_plot.figure, 'coil.png')
@@ -421,7 +555,53 @@ def run_gui(args):
     sys.exit(app.exec_())
 
 
-if __name__ == '__main__':
+def run_command(args):
+    if args.command == 'sweep':
+        run_sweep_command(args)
+    elif args.command == 'table':
+        run_table_command(args)
+    elif args.command == 'precision':
+        report = MLQModel(**model_kwargs(args)).precision_report()
+        print('%(dtype)s / quantize=%(quantize)s over %(rows)d validation rows: max |dQ| %(max_abs).4g, '
+              'mean %(mean_abs).4g, max relative %(max_rel).3g' % report)
+        print('worst at [freq, R, Lg, Ll, Tw] =', report['worst_sample'])
+        if not report['model_loaded']:
+            print('No model loaded: this compares the fallback analytic model with itself.')
+    elif args.command == 'serve':
+        # files are checked by the watcher thread; 0 turns reloading off
+        registry = ModelRegistry(check_interval=args.reload_interval if args.reload_interval > 0 else float('inf'))
+        registry.register(DEFAULT_MODEL_NAME, **model_kwargs(args))
+        if args.models:
+            names = registry.load_manifest(args.models, backend=args.backend, fold_scalers=args.fold_scalers,
+                                           dtype=args.dtype, quantize=args.quantize, xla=args.xla)
+            print('Loaded models:', ', '.join(names))
+        if args.reload_interval > 0:
+            registry.start_watcher()
+        run_server(registry.handle(DEFAULT_MODEL_NAME), args.host, args.port, args.unix, args.max_batch,
+                   args.max_wait_ms, registry=registry)
+    elif args.command == 'batch':
+        model = MLQModel(**model_kwargs(args))
+        n_ok = run_jobs(model, args.jobs, args.out, plots=args.plots, plot_prefix=args.plot_prefix,
+                        plot_workers=args.batch_plot_workers or args.plot_workers, group_size=args.group_size,
+                        plot_dpi=args.dpi, fast_plots=args.fast_plots)
+        print('Completed %d jobs; results in %s' % (n_ok, os.path.abspath(args.out)))
+    elif args.command == 'replay':
+        run_replay(args.jsonl, args.out, args.host, args.port, args.unix, args.concurrency)
+    elif args.nogui:
+        run_headless(args)
+    else:
+        try:
+            print('Launching GUI...')
+            run_gui(args)
+        except Exception as e:
+            print(f'ERROR: GUI failed to start: {e}')
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+
+
+def build_parser():
+    """Command-line parser; subcommand options use their own dest names."""
     parser = argparse.ArgumentParser(description='MLQ optimization GUI or headless runner')
     parser.add_argument('--nogui', action='store_true', help='Run in headless mode and save plots to disk')
     parser.add_argument('--out-prefix', default='mlq_output', help='Output filename prefix for headless plots')
@@ -430,8 +610,97 @@ if __name__ == '__main__':
     parser.add_argument('--Lg', default=5.0, help='Coil leg gap Lg (mm)')
     parser.add_argument('--Ll', default=10.0, help='Coil leg length Ll (mm)')
     parser.add_argument('--topk', default=10, help='Top-k percent region')
+    parser.add_argument('--backend', choices=BACKENDS, default='tf',
+                        help='Inference backend: TensorFlow/Keras, the pure-NumPy evaluator, or a precomputed Q table')
+    parser.add_argument('--table', default='q_table.npy', help='Q table file used by --backend lut')
+    parser.add_argument('--dtype', choices=DTYPES, default='float64',
+                        help='Inference precision (float32 halves memory traffic; NumPy weights follow it)')
+    parser.add_argument('--quantize', choices=QUANTIZE_MODES,
+                        help='Round the NumPy backend weights to bfloat16 or int8 (accuracy experiment)')
+    parser.add_argument('--model-dir', help='Directory with the model and scaler files (default: $MLQ_MODEL_DIR or the app directory)')
+    parser.add_argument('--xla', action='store_true', help='Compile the TensorFlow inference function with XLA')
+    parser.add_argument('--fold-scalers', action='store_true',
+                        help='Fold scaler_x/scaler_y into the network weights (NumPy backend only)')
+    parser.add_argument('--optimizer', choices=METHODS, default='grid',
+                        help='Trace-width search: fixed 100-point grid, or coarse grid plus golden/Brent/multi-start/gradient refinement')
+    parser.add_argument('--tol', default=1e-4, help='Trace-width tolerance (mm) for the refining optimizers')
+    parser.add_argument('--optimize-geometry', action='store_true',
+                        help='Headless: also search R/Lg/Ll (and Tw) at the given frequency and plot the best geometry')
+    parser.add_argument('--band', help="Headless: optimize Tw over a frequency band 'lo:hi[:num]' (MHz) instead of --freq")
+    parser.add_argument('--robust', choices=ROBUST_OBJECTIVES, default='min',
+                        help='Band objective: worst-case or mean Q over band and perturbations')
+    parser.add_argument('--tolerance', default='0',
+                        help="R/Lg/Ll tolerance in mm for --band, one value or 'R,Lg,Ll'")
+    parser.add_argument('--perturb-samples', type=int, default=0,
+                        help='Random R/Lg/Ll draws inside the tolerance box, on top of its 8 corners')
+    parser.add_argument('--sensitivity', action='store_true',
+                        help='Headless: print dQ/d(freq, R, Lg, Ll, Tw) at the optimum')
+    parser.add_argument('--dpi', type=int, default=150, help='Resolution of the saved PNGs')
+    parser.add_argument('--fast-plots', action='store_true',
+                        help='Fixed plot layout instead of tight_layout (cheaper rendering)')
+    parser.add_argument('--plot-workers', type=int,
+                        help='Processes rendering the three headless plots (default 1 = in-process)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Time the hot-path stages and count rows/batches/fallbacks/cache hits; print a report at exit')
+    parser.add_argument('--profile-out', help='Also write cProfile stats to this file (implies --profile)')
     parser.add_argument('--debug', action='store_true', help='Print debug info')
-    args = parser.parse_args()
+    subparsers = parser.add_subparsers(dest='command')
+    sweep_parser = subparsers.add_parser('sweep', help='Optimize Tw over a (freq, R, Lg, Ll) grid or scenario CSV in parallel')
+    # unset sweep axes/topk fall back to the global --freq/--R/--Lg/--Ll/--topk
+    sweep_parser.add_argument('--freq', dest='sweep_freq', help="Frequency axis: 'start:stop:num' or comma list (MHz)")
+    sweep_parser.add_argument('--R', dest='sweep_R', help="Outer radius axis: 'start:stop:num' or comma list (mm)")
+    sweep_parser.add_argument('--Lg', dest='sweep_Lg', help="Leg gap axis: 'start:stop:num' or comma list (mm)")
+    sweep_parser.add_argument('--Ll', dest='sweep_Ll', help="Leg length axis: 'start:stop:num' or comma list (mm)")
+    sweep_parser.add_argument('--scenarios', help='CSV with freq,R,Lg,Ll columns instead of a grid')
+    sweep_parser.add_argument('--out', default='sweep_results.csv',
+                              help='Output CSV, or a directory of parquet parts if it ends in .parquet')
+    sweep_parser.add_argument('--topk', dest='sweep_topk', help='Top-k percent region')
+    sweep_parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    sweep_parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE,
+                              help='Scenarios per work unit/checkpoint; keep it fixed when resuming')
+    sweep_parser.add_argument('--no-resume', action='store_true', help='Start over instead of resuming from the checkpoint')
+    subparsers.add_parser('precision', help='Max Q deviation of --dtype/--quantize from float64 on a validation grid')
+    table_parser = subparsers.add_parser('table', help='Tabulate the model on a 5-D grid for --backend lut')
+    for name, (lo, hi, num) in DEFAULT_TABLE_AXES.items():
+        table_parser.add_argument('--' + name, dest='table_' + name, default='%g:%g:%d' % (lo, hi, num),
+                                  help="%s axis: 'start:stop:num' or comma list" % name)
+    table_parser.add_argument('--out', default='q_table.npy', help='Table .npy path (axes go to a .json beside it)')
+    table_parser.add_argument('--store-dtype', choices=['float32', 'float64'], default='float32', help='Stored value type')
+    table_parser.add_argument('--refine-tol', help='Insert axis midpoints where interpolation misses Q by more than this')
+    table_parser.add_argument('--check-samples', type=int, default=DEFAULT_CHECK_SAMPLES,
+                              help='Random points used to measure the interpolation error (0 = skip)')
+    serve_parser = subparsers.add_parser('serve', help='Serve predict/optimize requests over HTTP from one warm model')
+    serve_parser.add_argument('--host', default=DEFAULT_HOST, help='Bind address')
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='TCP port')
+    serve_parser.add_argument('--unix', help='Listen on this Unix socket path instead of TCP')
+    serve_parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH, help='Max rows per micro-batch')
+    serve_parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS,
+                              help='Max time a request waits for its micro-batch to fill')
+    serve_parser.add_argument('--models', help='JSON manifest of extra named model/scaler sets, picked by a request\'s "model"')
+    serve_parser.add_argument('--reload-interval', type=float, default=DEFAULT_CHECK_INTERVAL,
+                              help='Seconds between checks for changed model files (0 = never reload)')
+    replay_parser = subparsers.add_parser('replay', help='Replay a JSONL file of requests against a running server')
+    replay_parser.add_argument('jsonl', help="Request file; each line is a JSON body with an optional 'op'")
+    replay_parser.add_argument('--out', help='Write responses as JSONL here')
+    replay_parser.add_argument('--host', default=DEFAULT_HOST, help='Server address')
+    replay_parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Server port')
+    replay_parser.add_argument('--unix', help='Connect to this Unix socket instead of TCP')
+    replay_parser.add_argument('--concurrency', type=int, default=32, help='Concurrent connections')
+    batch_parser = subparsers.add_parser('batch', help='Run a JSONL file of optimize jobs in vectorized groups')
+    batch_parser.add_argument('jobs', help='JSONL with freq, R, Lg, Ll and optional topk, out_prefix per line')
+    batch_parser.add_argument('--out', default='batch_results.jsonl', help='Result JSONL path')
+    batch_parser.add_argument('--plots', action='store_true', help='Also render the three PNGs per job')
+    batch_parser.add_argument('--plot-prefix', default='job', help='Plot prefix for jobs without out_prefix')
+    batch_parser.add_argument('--plot-workers', type=int, dest='batch_plot_workers',
+                              help='Plot rendering processes (default: the global --plot-workers)')
+    batch_parser.add_argument('--group-size', type=int, default=DEFAULT_GROUP_SIZE, help='Jobs per model call')
+    return parser
+
+
+if __name__ == '__main__':
+    # the frozen (PyInstaller) exe must not re-run main in pool workers
+    multiprocessing.freeze_support()
+    args = build_parser().parse_args()
 
     if args.debug:
         print('Debug: Python executable:', sys.executable)
@@ -443,14 +712,19 @@ if __name__ == '__main__':
         except Exception as e:
             print('Debug: PyQt5 check failed:', e)
 
-    if args.nogui:
-        run_headless(args)
-    else:
-        try:
-            print('Launching GUI...')
-            run_gui(args)
-        except Exception as e:
-            print(f'ERROR: GUI failed to start: {e}')
-            import traceback
-            traceback.print_exc()
-            sys.exit(1)
+    profiler = None
+    if args.profile or args.profile_out:
+        profiling.enable()
+    if args.profile_out:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        run_command(args)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile_out)
+            print('Saved cProfile stats:', os.path.abspath(args.profile_out))
+        if profiling.ENABLED:
+            print(profiling.report())
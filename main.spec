@@ -2,7 +2,7 @@ a = Analysis(
     ['main.py'],
     pathex=[],
     binaries=[],
-    datas=[('best_model_3_Meta_raw_data.keras', '.')],
+    datas=[('best_model_3_Meta_raw_data.keras', '.'), ('scaler_x.pkl', '.'), ('scaler_y.pkl', '.')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
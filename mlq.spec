@@ -25,6 +25,8 @@ hiddenimports = [
 
 datas = [
     ('best_model_3_Meta_raw_data.keras', '.'),     
+    ('scaler_x.pkl', '.'),
+    ('scaler_y.pkl', '.'),
 ]
 
 a = Analysis(
@@ -1,23 +1,117 @@
 import os
+import time
+import importlib.util
+import threading
 import numpy as np
 import logging
-import joblib
-try:
-    from tensorflow.keras.models import load_model
-    TF_AVAILABLE = True
-except Exception as e:
-    TF_AVAILABLE = False
-    logging.warning("TensorFlow not available: %s", e)
+from collections import OrderedDict
+from numpy_backend import NumpyMLP, QUANTIZE_MODES
+from lut import QTable
+import profiling
+
+# TensorFlow (and joblib/sklearn for the scalers) are imported only when a
+# model or scaler is actually loaded, so importing this module stays cheap.
+TF_AVAILABLE = importlib.util.find_spec('tensorflow') is not None
+
+# Rows per model call in predict_batch / predict_q
+DEFAULT_BATCH_SIZE = 8192
+
+# Inference backends: Keras/TensorFlow, the NumPy evaluator in numpy_backend,
+# or a precomputed Q table (lut.py) interpolated in place of the network
+BACKENDS = ('tf', 'numpy', 'lut')
+
+# dtype of the sample rows fed to the model (and of the NumPy backend's weights)
+DTYPES = ('float64', 'float32')
+
+# The TF backend runs a tf.function with one fixed [None, 5] float32
+# signature; chunks are zero-padded up to the next of these row counts, so
+# only len(TF_BUCKETS) shapes are ever compiled (larger chunks are split).
+TF_BUCKETS = (16, 128, 1024, 8192)
+
+# validation grid of precision_report, [frequency, R, Lg, Ll, trace_width]
+VALIDATION_AXES = (
+    np.linspace(100.0, 800.0, 8),
+    np.linspace(2.0, 12.0, 6),
+    np.linspace(1.0, 6.0, 6),
+    np.linspace(1.0, 10.0, 4),
+    np.linspace(0.1, 10.0, 12),
+)
+
+def scaler_affine(scaler):
+    """
+    Return (a, c) such that scaler.transform(X) == X * a + c, for the
+    sklearn MinMaxScaler and StandardScaler used with this model.
+    """
+    name = type(scaler).__name__
+    if name == 'MinMaxScaler':
+        if getattr(scaler, 'clip', False):
+            raise ValueError("MinMaxScaler with clip=True is not affine")
+        return np.asarray(scaler.scale_, dtype=float), np.asarray(scaler.min_, dtype=float)
+    if name == 'StandardScaler':
+        n = scaler.n_features_in_
+        scale = np.ones(n) if scaler.scale_ is None else np.asarray(scaler.scale_, dtype=float)
+        mean = np.zeros(n) if scaler.mean_ is None else np.asarray(scaler.mean_, dtype=float)
+        return 1.0 / scale, -mean / scale
+    raise ValueError("Cannot fold scaler of type %s" % name)
+
+def _broadcast_column(value, shape):
+    """
+    A single value as a float, anything else as a read-only view broadcast to
+    shape (flattened when that needs no copy); nothing is expanded to the
+    full row count here.
+    """
+    a = np.asarray(value)
+    if a.size == 1:
+        return float(a.reshape(-1)[0])
+    if a.shape == tuple(shape) and a.flags.c_contiguous:
+        return a.reshape(-1)
+    return np.broadcast_to(a, shape)
 
 class MLQModel:
-    def __init__(self, model_path=None, scaler_x_path=None, scaler_y_path=None):
+    def __init__(self, model_path=None, scaler_x_path=None, scaler_y_path=None, backend='tf',
+                 fold_scalers=False, cache_size=0, cache_decimals=6, dtype='float64', quantize=None, xla=False):
+        if backend not in BACKENDS:
+            raise ValueError("Unknown backend %r; expected one of %s" % (backend, ', '.join(BACKENDS)))
+        if str(dtype) not in DTYPES:
+            raise ValueError("Unknown dtype %r; expected one of %s" % (dtype, ', '.join(DTYPES)))
+        if quantize is not None and quantize not in QUANTIZE_MODES:
+            raise ValueError("Unknown quantization %r; expected one of %s" % (quantize, ', '.join(QUANTIZE_MODES)))
+        self.backend = backend
+        self.fold_scalers_on_load = fold_scalers
+        self.dtype = np.dtype(dtype)
+        self.quantize = quantize
+        # compile the TF inference function with XLA (jit_compile)
+        self.xla = bool(xla)
+        # per-thread sample buffer reused by predict_q/predict_batch
+        self._local = threading.local()
+        # opt-in LRU of predict_q results, keyed on inputs rounded to cache_decimals
+        self.cache_size = int(cache_size)
+        self.cache_decimals = int(cache_decimals)
+        self._cache = OrderedDict() if self.cache_size > 0 else None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # predictions answered by _fallback_q instead of the model
+        self.fallback_count = 0
+        with profiling.stage('model.load'):
+            self.load(model_path, scaler_x_path, scaler_y_path)
+
+    def load(self, model_path=None, scaler_x_path=None, scaler_y_path=None):
+        """(Re)load model and scalers; any cached predictions are dropped."""
         self.model = None
+        # True once scaler_x/scaler_y live inside the network weights
+        self.scalers_folded = False
         self.model_path = model_path
+        self.scaler_x_path = scaler_x_path
+        self.scaler_y_path = scaler_y_path
         self.scaler_x = None
         self.scaler_y = None
+        # compiled inference function of a Keras model (see _compile_tf)
+        self._tf_infer = None
+        self.clear_cache()
         # Load scalers 
         if scaler_x_path and os.path.exists(scaler_x_path):
             try:
+                import joblib
                 self.scaler_x = joblib.load(scaler_x_path)
                 logging.info("Loaded scaler_x from %s", scaler_x_path)
             except Exception as e:
@@ -25,15 +119,34 @@ class MLQModel:
                 self.scaler_x = None
         if scaler_y_path and os.path.exists(scaler_y_path):
             try:
+                import joblib
                 self.scaler_y = joblib.load(scaler_y_path)
                 logging.info("Loaded scaler_y from %s", scaler_y_path)
             except Exception as e:
                 logging.warning("Failed to load scaler_y from %s: %s", scaler_y_path, e)
                 self.scaler_y = None
 
-        if model_path and TF_AVAILABLE:
+        if model_path and self.backend == 'lut':
             try:
+                self.model = QTable.load(model_path)
+                # the table maps raw inputs to raw Q; the scalers are already baked in
+                self.scalers_folded = True
+                logging.info("Loaded Q table %s (error vs model: %s)", model_path, self.model.error)
+            except Exception as e:
+                logging.warning("Failed to load Q table from %s: %s", model_path, e)
+                self.model = None
+        elif model_path and self.backend == 'numpy':
+            try:
+                self.model = NumpyMLP.from_keras(model_path)
+                logging.info("Loaded NumPy model from %s", model_path)
+            except Exception as e:
+                logging.warning("Failed to load model from %s with NumPy backend: %s", model_path, e)
+                self.model = None
+        elif model_path and TF_AVAILABLE:
+            try:
+                from tensorflow.keras.models import load_model
                 self.model = load_model(model_path)
+                self._compile_tf()
                 logging.info("Loaded Keras model from %s", model_path)
             except Exception as e:
                 logging.warning("Failed to load model from %s: %s", model_path, e)
@@ -44,6 +157,92 @@ class MLQModel:
             else:
                 logging.info("No model path provided; using fallback analytic model.")
 
+        if isinstance(self.model, NumpyMLP):
+            # quantize the trained weights, before any scaler is folded into them
+            if self.quantize:
+                self.model.quantize(self.quantize)
+            self.model.astype(self.dtype)
+        elif self.quantize:
+            logging.warning("Weight quantization requires the NumPy backend; ignoring quantize=%s.", self.quantize)
+        if self.fold_scalers_on_load:
+            self.fold_scalers()
+
+    def _compile_tf(self):
+        """Wrap the Keras forward pass in a fixed-signature tf.function (XLA if self.xla)."""
+        import tensorflow as tf
+        model = self.model
+
+        @tf.function(input_signature=[tf.TensorSpec([None, 5], tf.float32)], jit_compile=self.xla)
+        def infer(x):
+            return model(x, training=False)
+
+        self._tf_infer = infer
+
+    def reload(self):
+        """Reload model and scalers from the paths they were loaded from."""
+        with profiling.stage('model.load'):
+            self.load(self.model_path, self.scaler_x_path, self.scaler_y_path)
+
+    def warmup(self):
+        """
+        Run one dummy batch per TF bucket size (a single small batch for the
+        other backends), so tracing and compilation happen before the first
+        real request. Returns the seconds spent.
+        """
+        start = time.perf_counter()
+        if self.model is not None:
+            sizes = TF_BUCKETS if self._tf_infer is not None else TF_BUCKETS[:1]
+            with profiling.stage('model.warmup'):
+                for rows in sizes:
+                    self.predict_batch(trace_width=np.full(rows, 1.0), frequency=400.0, R=6.0, Lg=5.0, Ll=10.0)
+        return time.perf_counter() - start
+
+    def clear_cache(self):
+        if self._cache is not None:
+            self._cache.clear()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def cache_info(self):
+        return {
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'size': len(self._cache) if self._cache is not None else 0,
+            'maxsize': self.cache_size,
+        }
+
+    def _cache_key(self, tw_b, fr_b, R, Lg, Ll):
+        d = self.cache_decimals
+        # + 0.0 turns -0.0 into 0.0 so both round to the same bytes
+        return (tw_b.shape,
+                (np.round(tw_b, d) + 0.0).tobytes(),
+                (np.round(fr_b, d) + 0.0).tobytes(),
+                round(float(R), d), round(float(Lg), d), round(float(Ll), d))
+
+    def fold_scalers(self):
+        """
+        Fold scaler_x into the first Dense layer and the inverse of scaler_y
+        into the output, so a prediction is a single forward pass on raw
+        inputs. Only the NumPy backend supports this; returns True on success.
+        """
+        if self.scalers_folded:
+            return True
+        if not isinstance(self.model, NumpyMLP):
+            logging.warning("fold_scalers requires the NumPy backend; keeping separate scaler transforms.")
+            return False
+        try:
+            if self.scaler_x is not None:
+                self.model.fold_input_affine(*scaler_affine(self.scaler_x))
+            if self.scaler_y is not None:
+                a, c = scaler_affine(self.scaler_y)
+                # inverse_transform: y = (y_s - c) / a
+                self.model.fold_output_affine(1.0 / a, -c / a)
+        except Exception as e:
+            logging.warning("Could not fold scalers into the model: %s", e)
+            return False
+        self.scalers_folded = True
+        return True
+
     def predict_q(self, trace_width, frequency, R, Lg, Ll):
         """
         Predict Q factor. Input ordering for model/scaler is assumed to be:
@@ -55,34 +254,265 @@ class MLQModel:
         fr = np.array(frequency, dtype=float)
         tw_b, fr_b = np.broadcast_arrays(tw, fr)
 
-        n = tw_b.size
-        samples = np.stack([
-            fr_b.ravel(),
-            np.full(n, R, dtype=float),
-            np.full(n, Lg, dtype=float),
-            np.full(n, Ll, dtype=float),
-            tw_b.ravel()
-        ], axis=1)
-
         if self.model is not None:
+            key = None
+            if self._cache is not None:
+                key = self._cache_key(tw_b, fr_b, R, Lg, Ll)
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    self.cache_hits += 1
+                    profiling.count('cache.hits')
+                    return cached.copy()
+                self.cache_misses += 1
+                profiling.count('cache.misses')
+
             try:
-                X = samples
-                if self.scaler_x is not None:
-                    X = self.scaler_x.transform(X)
-                preds = self.model.predict(X, verbose=0)
-                preds = np.array(preds)
-                # if scaler_y exists, inverse_transform
-                if self.scaler_y is not None:
-                    # ensure shape (n, 1)
-                    preds_inv = self.scaler_y.inverse_transform(preds.reshape(-1, 1))
-                    preds = preds_inv.ravel()
-                else:
-                    preds = preds.ravel()
-                return preds.reshape(tw_b.shape)
+                columns = [_broadcast_column(c, tw_b.shape) for c in (fr, R, Lg, Ll, tw)]
+                preds = self._predict_columns(columns, tw_b.shape).reshape(tw_b.shape)
+                if key is not None:
+                    self._cache[key] = preds.copy()
+                    if len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+                return preds
             except Exception as e:
                 logging.warning("Model prediction failed: %s. Using fallback.", e)
+        self._count_fallback(tw_b.size)
         return self._fallback_q(tw_b, fr_b, R, Lg, Ll)
 
+    def predict_batch(self, X=None, trace_width=None, frequency=None, R=None, Lg=None, Ll=None,
+                      batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Predict Q factor for many designs at once.
+        Either pass X as an (N, 5) array ordered [frequency, R, Lg, Ll, trace_width]
+        or give all five features as keyword arguments; scalars and arrays are
+        broadcast against each other and the result takes the broadcast shape.
+        Rows are processed in chunks of batch_size, with one scaler transform
+        and one model call per chunk. Keyword columns stay scalars or
+        broadcast views; only the rows of the current chunk are copied into
+        a reused (batch_size, 5) buffer, so no N-row array is built per column.
+        """
+        if X is not None:
+            samples, out_shape = self._batch_samples(X, None, None, None, None, None)
+            columns = samples.T
+        else:
+            columns = [frequency, R, Lg, Ll, trace_width]
+            if any(c is None for c in columns):
+                raise ValueError("Pass either X or all of trace_width, frequency, R, Lg and Ll")
+            out_shape = np.broadcast_shapes(*[np.shape(c) for c in columns])
+        n = int(np.prod(out_shape))
+        if self.model is not None:
+            try:
+                if X is not None:
+                    return self._predict_samples(samples, batch_size).reshape(out_shape)
+                views = [_broadcast_column(c, out_shape) for c in columns]
+                return self._predict_columns(views, out_shape, batch_size).reshape(out_shape)
+            except Exception as e:
+                logging.warning("Model prediction failed: %s. Using fallback.", e)
+        self._count_fallback(n)
+        fr_b, R_b, Lg_b, Ll_b, tw_b = np.broadcast_arrays(*[np.asarray(c, dtype=float) for c in columns])
+        return self._fallback_q(tw_b, fr_b, R_b, Lg_b, Ll_b).reshape(out_shape)
+
+    @staticmethod
+    def _batch_samples(X, trace_width, frequency, R, Lg, Ll):
+        """(n, 5) sample matrix and result shape for the predict_batch argument forms."""
+        if X is not None:
+            samples = np.asarray(X, dtype=float)
+            if samples.ndim != 2 or samples.shape[1] != 5:
+                raise ValueError("X must have shape (N, 5), got %s" % (samples.shape,))
+            return samples, samples.shape[:1]
+        columns = [frequency, R, Lg, Ll, trace_width]
+        if any(c is None for c in columns):
+            raise ValueError("Pass either X or all of trace_width, frequency, R, Lg and Ll")
+        cols = np.broadcast_arrays(*[np.asarray(c, dtype=float) for c in columns])
+        return np.stack([c.ravel() for c in cols], axis=1), cols[0].shape
+
+    def predict_q_and_grad(self, X=None, trace_width=None, frequency=None, R=None, Lg=None, Ll=None,
+                           batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Q and its gradient with respect to all five inputs in one batched pass.
+        Takes the same arguments as predict_batch. Returns (Q, grad) where grad
+        has a trailing axis of 5 ordered [frequency, R, Lg, Ll, trace_width],
+        in raw units (the scaler transforms are included in the chain rule).
+        The NumPy backend backpropagates by hand, TensorFlow uses GradientTape,
+        a Q table uses central differences and the fallback is closed-form.
+        """
+        samples, out_shape = self._batch_samples(X, trace_width, frequency, R, Lg, Ll)
+        if self.model is not None:
+            try:
+                Q, grad = self._predict_grad_samples(samples, batch_size)
+                return Q.reshape(out_shape), grad.reshape(out_shape + (5,))
+            except Exception as e:
+                logging.warning("Model gradient failed: %s. Using fallback.", e)
+        self._count_fallback(samples.shape[0])
+        Q, grad = self._fallback_q_and_grad(*samples.T)
+        return Q.reshape(out_shape), grad.reshape(out_shape + (5,))
+
+    def precision_report(self, X=None, reference=None):
+        """
+        Max deviation of this model's Q from a float64, unquantized copy of
+        it (or from reference) on X, by default the VALIDATION_AXES grid.
+        """
+        if X is None:
+            X = np.column_stack([g.ravel() for g in np.meshgrid(*VALIDATION_AXES, indexing='ij')])
+        if reference is None:
+            reference = MLQModel(self.model_path, self.scaler_x_path, self.scaler_y_path, backend=self.backend,
+                                 fold_scalers=self.fold_scalers_on_load)
+        ref = reference.predict_batch(X)
+        err = np.abs(self.predict_batch(X) - ref)
+        worst = int(np.argmax(err))
+        return {
+            'dtype': str(self.dtype),
+            'quantize': self.quantize,
+            'model_loaded': self.model is not None,
+            'rows': int(X.shape[0]),
+            'max_abs': float(err[worst]),
+            'mean_abs': float(err.mean()),
+            'max_rel': float((err / np.maximum(np.abs(ref), 1e-12)).max()),
+            'worst_sample': [float(v) for v in X[worst]],
+        }
+
+    def _count_fallback(self, rows):
+        self.fallback_count += 1
+        profiling.count('fallback.calls')
+        profiling.count('fallback.rows', rows)
+
+    def stats(self):
+        """Cache and fallback counters of this model."""
+        return dict(self.cache_info(), fallbacks=self.fallback_count, backend=self.backend,
+                    model_loaded=self.model is not None)
+
+    def _predict_grad_samples(self, samples, batch_size=DEFAULT_BATCH_SIZE):
+        n = samples.shape[0]
+        batch_size = max(int(batch_size), 1)
+        if isinstance(self.model, QTable):
+            return self._numeric_grad_samples(samples, batch_size)
+        unfolded = not self.scalers_folded
+        a_x, c_x = (scaler_affine(self.scaler_x) if self.scaler_x is not None and unfolded
+                    else (np.ones(5), np.zeros(5)))
+        a_y, c_y = (scaler_affine(self.scaler_y) if self.scaler_y is not None and unfolded
+                    else (np.ones(1), np.zeros(1)))
+        Q = np.empty(n, dtype=float)
+        grad = np.empty((n, 5), dtype=float)
+        for start in range(0, n, batch_size):
+            X = samples[start:start + batch_size] * a_x + c_x
+            profiling.count('grad.batches')
+            profiling.count('grad.rows', X.shape[0])
+            if isinstance(self.model, NumpyMLP):
+                with profiling.stage('model.predict_with_grad'):
+                    y, g = self.model.predict_with_grad(X)
+            else:
+                import tensorflow as tf
+                x = tf.convert_to_tensor(X, dtype=tf.float32)
+                with profiling.stage('model.gradient_tape'):
+                    with tf.GradientTape() as tape:
+                        tape.watch(x)
+                        out = self.model(x, training=False)
+                    # rows are independent in inference mode, so d(sum)/dx is the per-row gradient
+                    y = np.asarray(out, dtype=float).reshape(-1)
+                    g = np.asarray(tape.gradient(out, x), dtype=float)
+            # y = (y_s - c_y) / a_y and x_s = x * a_x + c_x
+            Q[start:start + X.shape[0]] = (y - c_y[0]) / a_y[0]
+            grad[start:start + X.shape[0]] = g * a_x / a_y[0]
+        return Q, grad
+
+    def _numeric_grad_samples(self, samples, batch_size=DEFAULT_BATCH_SIZE):
+        """Central differences, for models without a backward pass."""
+        Q = self._predict_samples(samples, batch_size)
+        grad = np.empty(samples.shape, dtype=float)
+        h = 1e-4 * np.maximum(np.abs(samples), 1.0)
+        for k in range(samples.shape[1]):
+            up, down = samples.copy(), samples.copy()
+            up[:, k] += h[:, k]
+            down[:, k] -= h[:, k]
+            grad[:, k] = (self._predict_samples(up, batch_size) - self._predict_samples(down, batch_size)) / (2 * h[:, k])
+        return Q, grad
+
+    def _buffer(self, rows):
+        """This thread's (rows, 5) sample buffer in self.dtype, grown when too small."""
+        buf = getattr(self._local, 'buffer', None)
+        if buf is None or buf.shape[0] < rows or buf.dtype != self.dtype:
+            buf = np.empty((rows, 5), dtype=self.dtype)
+            self._local.buffer = buf
+        return buf[:rows]
+
+    def _predict_columns(self, columns, shape, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Like _predict_samples, for five feature columns from _broadcast_column
+        (scalars, flat arrays or views of shape): each chunk is assembled in
+        the reused buffer, converting to self.dtype as it is copied.
+        """
+        n = int(np.prod(shape))
+        batch_size = max(int(batch_size), 1)
+        buf = self._buffer(min(n, batch_size))
+        out = np.empty(n, dtype=float)
+        for start in range(0, n, batch_size):
+            stop = min(start + batch_size, n)
+            X = buf[:stop - start]
+            index = None
+            for k, col in enumerate(columns):
+                if np.ndim(col) == 0:
+                    X[:, k] = col
+                elif np.ndim(col) == 1:
+                    X[:, k] = col[start:stop]
+                else:
+                    # flat rows start..stop of an N-d view, without materializing it
+                    if index is None:
+                        index = np.unravel_index(np.arange(start, stop), shape)
+                    X[:, k] = col[index]
+            out[start:stop] = self._predict_chunk(X)
+        return out
+
+    def _predict_samples(self, samples, batch_size=DEFAULT_BATCH_SIZE):
+        """Run the scaler/model pipeline on an (n, 5) sample matrix, chunk by chunk."""
+        n = samples.shape[0]
+        batch_size = max(int(batch_size), 1)
+        out = np.empty(n, dtype=float)
+        for start in range(0, n, batch_size):
+            X = samples[start:start + batch_size].astype(self.dtype, copy=False)
+            out[start:start + X.shape[0]] = self._predict_chunk(X)
+        return out
+
+    def _predict_chunk(self, X):
+        """Scaler transform, one model call and inverse transform for one chunk of rows."""
+        profiling.count('predict.batches')
+        profiling.count('predict.rows', X.shape[0])
+        if self.scaler_x is not None and not self.scalers_folded:
+            with profiling.stage('scaler_x.transform'):
+                X = self.scaler_x.transform(X)
+        # a single forward pass over the whole chunk
+        with profiling.stage('model.predict'):
+            if self._tf_infer is not None:
+                preds = self._predict_tf(X)
+            else:
+                preds = np.array(self.model.predict(X, verbose=0, batch_size=X.shape[0]))
+        # if scaler_y exists, inverse_transform
+        if self.scaler_y is not None and not self.scalers_folded:
+            # ensure shape (n, 1)
+            with profiling.stage('scaler_y.inverse_transform'):
+                preds = self.scaler_y.inverse_transform(preds.reshape(-1, 1))
+        return preds.ravel()
+
+    def _predict_tf(self, X):
+        """Compiled TF forward pass, each piece zero-padded to its TF_BUCKETS size."""
+        n = X.shape[0]
+        out = np.empty(n, dtype=float)
+        pads = getattr(self._local, 'tf_pads', None)
+        if pads is None:
+            pads = self._local.tf_pads = {}
+        for start in range(0, n, TF_BUCKETS[-1]):
+            rows = min(TF_BUCKETS[-1], n - start)
+            size = next(b for b in TF_BUCKETS if b >= rows)
+            pad = pads.get(size)
+            if pad is None:
+                pad = pads[size] = np.zeros((size, 5), dtype=np.float32)
+            pad[:rows] = X[start:start + rows]
+            # the buffer is reused, so clear rows left over from a longer earlier piece
+            pad[rows:] = 0.0
+            profiling.count('tf.padded_rows', size - rows)
+            out[start:start + rows] = self._tf_infer(pad).numpy().reshape(-1)[:rows]
+        return out
+
     @staticmethod
     def _fallback_q(trace_width, frequency, R, Lg, Ll):
         q_tw = 415.0 - 9.5 * trace_width
@@ -90,3 +520,20 @@ class MLQModel:
         geom_factor = 1.0 - 0.02 * (R - 6.0) + 0.01 * (Ll - 10.0) - 0.015 * (Lg - 5.0)
         q_combined = np.minimum(q_tw, q_fr) * geom_factor
         return q_combined
+
+    @staticmethod
+    def _fallback_q_and_grad(frequency, R, Lg, Ll, trace_width):
+        """_fallback_q and its gradient, ordered [frequency, R, Lg, Ll, trace_width]."""
+        q_tw = 415.0 - 9.5 * trace_width
+        q_fr = -0.000012 * (frequency - 400.0) ** 2 + 132.0
+        geom_factor = 1.0 - 0.02 * (R - 6.0) + 0.01 * (Ll - 10.0) - 0.015 * (Lg - 5.0)
+        q_min = np.minimum(q_tw, q_fr)
+        # the minimum passes the gradient of whichever branch is active
+        tw_active = q_tw < q_fr
+        grad = np.stack(np.broadcast_arrays(
+            np.where(tw_active, 0.0, -0.000024 * (frequency - 400.0)) * geom_factor,
+            -0.02 * q_min,
+            -0.015 * q_min,
+            0.01 * q_min,
+            np.where(tw_active, -9.5, 0.0) * geom_factor), axis=-1)
+        return q_min * geom_factor, grad
@@ -0,0 +1,262 @@
+import json
+import re
+import zipfile
+import io
+import numpy as np
+
+
+def _to_snake_case(name):
+    # same rule Keras uses to derive the weight-file paths of a Sequential's layers
+    name = re.sub(r"\W+", "", name)
+    name = re.sub("(.)([A-Z][a-z]+)", r"\1_\2", name)
+    name = re.sub("([a-z])([A-Z])", r"\1_\2", name)
+    return name.lower()
+
+
+def _leaky_relu(x, alpha):
+    return np.where(x >= 0, x, alpha * x)
+
+
+def _swish_grad(x):
+    s = 1.0 / (1.0 + np.exp(-x))
+    return s * (1.0 + x * (1.0 - s))
+
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'sigmoid': lambda x: 1.0 / (1.0 + np.exp(-x)),
+    'tanh': np.tanh,
+    'softplus': lambda x: np.logaddexp(0, x),
+    'elu': lambda x: np.where(x > 0, x, np.expm1(np.minimum(x, 0))),
+    'swish': lambda x: x / (1.0 + np.exp(-x)),
+    'silu': lambda x: x / (1.0 + np.exp(-x)),
+    'leaky_relu': lambda x: _leaky_relu(x, 0.2),
+}
+
+# derivative of each activation, given its input x and output y
+DERIVATIVES = {
+    'linear': lambda x, y: np.ones_like(x),
+    'relu': lambda x, y: (x > 0).astype(float),
+    'sigmoid': lambda x, y: y * (1.0 - y),
+    'tanh': lambda x, y: 1.0 - y * y,
+    'softplus': lambda x, y: 1.0 / (1.0 + np.exp(-x)),
+    'elu': lambda x, y: np.where(x > 0, 1.0, y + 1.0),
+    'swish': lambda x, y: _swish_grad(x),
+    'silu': lambda x, y: _swish_grad(x),
+    'leaky_relu': lambda x, y: np.where(x >= 0, 1.0, 0.2),
+}
+
+
+# weight rounding modes of NumpyMLP.quantize
+QUANTIZE_MODES = ('bf16', 'int8')
+
+
+class NumpyMLP:
+    """
+    Inference-only evaluator for a Sequential Keras MLP using plain NumPy.
+    The network is held as a list of steps:
+      ('dense', W, b)         x @ W + b
+      ('affine', scale, shift) x * scale + shift (BatchNormalization, scaler folds)
+      ('act', name, param)    elementwise activation
+    Mirrors the subset of the Keras model API that MLQModel uses.
+    """
+
+    def __init__(self, steps, dtype=np.float64):
+        self.steps = _fold_affine(list(steps))
+        self.dtype = np.dtype(dtype)
+        self.astype(self.dtype)
+
+    @classmethod
+    def from_keras(cls, path):
+        """Build from a Keras 3 .keras archive (config.json + model.weights.h5)."""
+        try:
+            import h5py
+        except Exception as e:
+            raise RuntimeError("h5py is required to read %s: %s" % (path, e))
+        with zipfile.ZipFile(path) as zf:
+            config = json.loads(zf.read('config.json'))
+            weights = zf.read('model.weights.h5')
+        if config.get('class_name') != 'Sequential':
+            raise ValueError("Only Sequential models are supported, got %s" % config.get('class_name'))
+
+        steps = []
+        seen = {}
+        with h5py.File(io.BytesIO(weights), 'r') as h5:
+            for layer in config['config']['layers']:
+                kind = layer['class_name']
+                cfg = layer['config']
+                if kind == 'InputLayer':
+                    continue
+                key = _to_snake_case(kind)
+                idx = seen.get(key, 0)
+                seen[key] = idx + 1
+                path_name = key if idx == 0 else '%s_%d' % (key, idx)
+                group = h5['layers'].get(path_name)
+                if group is None:
+                    group = h5['layers'].get(cfg.get('name'))
+                vars_ = [np.array(group['vars'][str(i)]) for i in range(len(group['vars']))] if group is not None else []
+
+                if kind == 'Dense':
+                    W = vars_[0].astype(float)
+                    b = vars_[1].astype(float) if cfg.get('use_bias', True) else np.zeros(W.shape[1])
+                    steps.append(('dense', W, b))
+                    steps.extend(_activation_steps(cfg.get('activation', 'linear')))
+                elif kind == 'BatchNormalization':
+                    pos = 0
+                    gamma = beta = None
+                    if cfg.get('scale', True):
+                        gamma = vars_[pos].astype(float)
+                        pos += 1
+                    if cfg.get('center', True):
+                        beta = vars_[pos].astype(float)
+                        pos += 1
+                    mean, var = vars_[pos].astype(float), vars_[pos + 1].astype(float)
+                    scale = 1.0 / np.sqrt(var + cfg.get('epsilon', 1e-3))
+                    if gamma is not None:
+                        scale = scale * gamma
+                    shift = -mean * scale
+                    if beta is not None:
+                        shift = shift + beta
+                    steps.append(('affine', scale, shift))
+                elif kind == 'LeakyReLU':
+                    slope = cfg.get('negative_slope', cfg.get('alpha', 0.3))
+                    steps.append(('act', 'leaky_relu', float(slope)))
+                elif kind == 'ReLU':
+                    steps.append(('act', 'relu', None))
+                elif kind == 'Activation':
+                    steps.extend(_activation_steps(cfg['activation']))
+                elif kind in ('Dropout', 'GaussianNoise', 'GaussianDropout', 'AlphaDropout'):
+                    # identity at inference time
+                    continue
+                else:
+                    raise ValueError("Unsupported layer type for NumPy backend: %s" % kind)
+        return cls(steps)
+
+    def fold_input_affine(self, scale, shift):
+        """Absorb an input transform x -> x * scale + shift into the first layer."""
+        self.steps = _fold_affine([('affine', np.asarray(scale, dtype=float), np.asarray(shift, dtype=float))] + self.steps)
+        self.astype(self.dtype)
+
+    def fold_output_affine(self, scale, shift):
+        """Absorb an output transform y -> y * scale + shift into the last layer."""
+        self.steps = _fold_affine(self.steps + [('affine', np.asarray(scale, dtype=float), np.asarray(shift, dtype=float))])
+        self.astype(self.dtype)
+
+    def astype(self, dtype):
+        """Hold all parameters (and run the forward pass) in dtype, e.g. float32."""
+        self.dtype = np.dtype(dtype)
+        self.steps = [(step[0], step[1].astype(self.dtype), step[2].astype(self.dtype)) if step[0] != 'act' else step
+                      for step in self.steps]
+        return self
+
+    def quantize(self, mode):
+        """
+        Round the dense weights to bfloat16 ('bf16') or to symmetric int8 with
+        one scale per output unit ('int8'). NumPy has no bf16/int8 matmul, so
+        the rounded weights are stored back in the compute dtype: this gives
+        the accuracy of the quantized network, not a smaller matmul.
+        """
+        if mode not in QUANTIZE_MODES:
+            raise ValueError("Unknown quantization %r; expected one of %s" % (mode, ', '.join(QUANTIZE_MODES)))
+        steps = []
+        for step in self.steps:
+            if step[0] == 'dense':
+                W = _round_bf16(step[1]) if mode == 'bf16' else _round_int8(step[1])
+                step = ('dense', W.astype(self.dtype), step[2])
+            steps.append(step)
+        self.steps = steps
+        return self
+
+    def predict(self, X, verbose=0, batch_size=None):
+        """Forward pass on an (n, features) array; returns (n, outputs)."""
+        h = np.asarray(X, dtype=self.dtype)
+        for step in self.steps:
+            if step[0] == 'dense':
+                h = h @ step[1] + step[2]
+            elif step[0] == 'affine':
+                h = h * step[1] + step[2]
+            elif step[1] == 'leaky_relu' and step[2] is not None:
+                h = _leaky_relu(h, step[2])
+            else:
+                h = ACTIVATIONS[step[1]](h)
+        return h
+
+    __call__ = predict
+
+    def predict_with_grad(self, X):
+        """
+        Forward pass plus the gradient of the (single) output with respect to
+        every input feature, by backpropagation through the stored steps.
+        Returns (y of shape (n,), dy/dX of shape (n, features)).
+        """
+        h = np.asarray(X, dtype=float)
+        # per-step factors needed on the way back
+        tape = []
+        for step in self.steps:
+            if step[0] == 'dense':
+                h = h @ step[1] + step[2]
+            elif step[0] == 'affine':
+                h = h * step[1] + step[2]
+            else:
+                x = h
+                if step[1] == 'leaky_relu' and step[2] is not None:
+                    h = _leaky_relu(x, step[2])
+                    tape.append(np.where(x >= 0, 1.0, step[2]))
+                else:
+                    h = ACTIVATIONS[step[1]](x)
+                    tape.append(DERIVATIVES[step[1]](x, h))
+        if h.ndim != 2 or h.shape[1] != 1:
+            raise ValueError("predict_with_grad needs a single-output network, got shape %s" % (h.shape,))
+        g = np.ones_like(h)
+        for step in reversed(self.steps):
+            if step[0] == 'dense':
+                g = g @ step[1].T
+            elif step[0] == 'affine':
+                g = g * step[1]
+            else:
+                g = g * tape.pop()
+        return h[:, 0], g
+
+
+def _round_bf16(W):
+    """Round to the nearest bfloat16 value (upper 16 bits of float32, ties to even)."""
+    bits = np.asarray(W, dtype=np.float32).view(np.uint32)
+    bits = (bits + np.uint32(0x7FFF) + ((bits >> 16) & np.uint32(1))) & np.uint32(0xFFFF0000)
+    return bits.view(np.float32)
+
+
+def _round_int8(W):
+    """Symmetric per-column int8 quantization, returned dequantized."""
+    W = np.asarray(W, dtype=float)
+    scale = np.abs(W).max(axis=0) / 127.0
+    scale[scale == 0] = 1.0
+    return np.clip(np.round(W / scale), -127, 127) * scale
+
+
+def _activation_steps(activation):
+    if isinstance(activation, dict):
+        activation = activation.get('config', {}).get('name', activation.get('class_name'))
+    if activation in (None, 'linear'):
+        return []
+    if activation not in ACTIVATIONS:
+        raise ValueError("Unsupported activation for NumPy backend: %s" % activation)
+    return [('act', activation, None)]
+
+
+def _fold_affine(steps):
+    """Merge each per-feature affine step into the dense layer on either side of it."""
+    out = []
+    for step in steps:
+        prev = out[-1] if out else None
+        if step[0] == 'dense' and prev is not None and prev[0] == 'affine':
+            # (x * s + t) @ W + b == x @ (s[:, None] * W) + (t @ W + b)
+            _, s, t = out.pop()
+            out.append(('dense', s[:, None] * step[1], t @ step[1] + step[2]))
+        elif step[0] == 'affine' and prev is not None and prev[0] == 'dense':
+            # (x @ W + b) * s + t == x @ (W * s) + (b * s + t)
+            _, W, b = out.pop()
+            out.append(('dense', W * step[1], b * step[1] + step[2]))
+        else:
+            out.append(step)
+    return out
@@ -0,0 +1,607 @@
+import itertools
+import numpy as np
+import profiling
+
+# Trace-width search range (mm)
+TW_MIN = 0.1
+TW_MAX = 10.0
+GRID_POINTS = 100
+
+# 'grid' is the original fixed linspace; the others refine a coarse grid
+METHODS = ('grid', 'golden', 'brent', 'multistart', 'gradient')
+
+# input order of MLQModel.predict_q_and_grad gradients
+GRAD_FEATURES = ('freq', 'R', 'Lg', 'Ll', 'Tw')
+
+INV_PHI = (np.sqrt(5.0) - 1.0) / 2.0
+
+
+def optimize_compute(model, freq, R, Lg, Ll, topk_percent=10, method='grid', tol=1e-4,
+                     coarse_points=21, n_starts=3):
+    """
+    Find the trace width with maximum Q for one (freq, R, Lg, Ll) design.
+    method='grid' evaluates a fixed 100-point grid. 'golden' and 'brent'
+    evaluate a coarse grid of coarse_points and refine the best bracket to
+    tol mm; 'multistart' refines the n_starts best local maxima of the
+    coarse grid at once. 'gradient' runs projected gradient ascent from the
+    n_starts best coarse maxima using model.predict_q_and_grad.
+    Tw_vals/Q_vals hold the grid (the coarse grid for the refining methods),
+    which is where the top-k% region is taken; best_tw/Q_max is the refined
+    optimum when it beats the best grid point.
+    """
+    if method not in METHODS:
+        raise ValueError("Unknown method %r; expected one of %s" % (method, ', '.join(METHODS)))
+
+    def f(tw):
+        return np.asarray(model.predict_q(tw, freq, R, Lg, Ll), dtype=float)
+
+    with profiling.stage('optimize.' + method):
+        if method == 'grid':
+            Tw_vals = np.linspace(TW_MIN, TW_MAX, GRID_POINTS)
+            Q_vals = model.predict_q(Tw_vals, freq, R, Lg, Ll)
+        elif method == 'gradient':
+            xs = np.linspace(TW_MIN, TW_MAX, int(coarse_points))
+            ys = f(xs)
+            starts = xs[_local_maxima(ys)[:int(n_starts)]]
+
+            def fg(x):
+                Q, grad = model.predict_q_and_grad(trace_width=x[:, 0], frequency=freq, R=R, Lg=Lg, Ll=Ll)
+                return Q, grad[:, 4:5]
+
+            # the ascent starts on the coarse grid; only its end point is reported
+            x_best, f_best, _, _ = projected_gradient_max(fg, starts[:, None], [TW_MIN], [TW_MAX], tol=tol)
+            return summarize_sweep(xs, ys, topk_percent, best=(x_best[0], f_best))
+        else:
+            Tw_vals, Q_vals, x_best, f_best = refine_max(f, TW_MIN, TW_MAX, method=method, tol=tol,
+                                                         coarse_points=coarse_points, n_starts=n_starts)
+            return summarize_sweep(Tw_vals, Q_vals, topk_percent, best=(x_best, f_best))
+    return summarize_sweep(Tw_vals, Q_vals, topk_percent)
+
+
+def grid_optimize(model, designs, topk_percent=10, Tw_vals=None):
+    """
+    Grid-optimize Tw for an (n, 4) array of (freq, R, Lg, Ll) designs with a
+    single predict_batch call over the fixed Tw grid. Returns
+    (Tw_vals, Q, idx, Q_max, region) as described in grid_maxima.
+    """
+    Tw_vals = np.linspace(TW_MIN, TW_MAX, GRID_POINTS) if Tw_vals is None else np.asarray(Tw_vals, dtype=float)
+    designs = np.asarray(designs, dtype=float).reshape(-1, 4)
+    fr, R, Lg, Ll = (designs[:, i:i + 1] for i in range(4))
+    Q = np.asarray(model.predict_batch(trace_width=Tw_vals[None, :], frequency=fr, R=R, Lg=Lg, Ll=Ll), dtype=float)
+    return (Tw_vals, Q) + grid_maxima(Q, topk_percent)
+
+
+def grid_maxima(Q, topk_percent=10):
+    """
+    Per-row maximum and top-k% region of an (n, G) matrix of Q over a Tw
+    grid; topk_percent is a scalar or one value per row. Returns (idx,
+    Q_max, region) with region an (n, G) boolean mask. Rows with no finite
+    Q get idx -1, Q_max NaN and an empty region instead of raising.
+    """
+    Q = np.asarray(Q, dtype=float)
+    valid = ~np.all(np.isnan(Q), axis=1)
+    idx = np.full(Q.shape[0], -1, dtype=np.intp)
+    idx[valid] = np.nanargmax(Q[valid], axis=1)
+    Q_max = np.full(Q.shape[0], np.nan)
+    Q_max[valid] = Q[valid, idx[valid]]
+    threshold = Q_max * (1 - np.asarray(topk_percent, dtype=float) / 100.0)
+    with np.errstate(invalid='ignore'):
+        region = Q >= threshold[:, None]
+    return idx, Q_max, region
+
+
+def summarize_sweep(Tw_vals, Q_vals, topk_percent=10, best=None):
+    """
+    Best point, top-k% region and result text for an evaluated Tw sweep.
+    best is an optional refined (Tw, Q) optimum found off the sweep grid.
+    No model calls, so a new topk_percent can be applied to a cached sweep.
+    """
+    with profiling.stage('summarize_sweep'):
+        return SweepResult(Tw_vals, Q_vals, topk_percent, best=best)
+
+
+class SweepResult:
+    """
+    Result of optimize_compute / summarize_sweep, held as NumPy arrays.
+    The top-k% region is an index array into Tw_vals/Q_vals (in Tw order);
+    a refined off-grid optimum passed as best=(Tw, Q) replaces the grid
+    maximum as best_tw/Q_max when it is higher, without joining the region.
+    result_text and top_k_df are built only when asked for. Supports the
+    dict-style access of the former result dict (res['best_tw'],
+    res['top_k_df'], ...) and extra keys assigned by callers.
+    """
+
+    __slots__ = ('Tw_vals', 'Q_vals', 'best_tw', 'Q_max', 'topk_percent', 'top_idx', '_best', '_text', '_extra')
+
+    KEYS = ('Tw_vals', 'Q_vals', 'best_tw', 'Q_max', 'top_k_df', 'result_text')
+
+    def __init__(self, Tw_vals, Q_vals, topk_percent=10, extra=None, best=None):
+        self.Tw_vals = np.asarray(Tw_vals, dtype=float)
+        self.Q_vals = np.asarray(Q_vals, dtype=float)
+        idx_max = int(np.nanargmax(self.Q_vals))
+        self.Q_max = float(self.Q_vals[idx_max])
+        self.best_tw = float(self.Tw_vals[idx_max])
+        self._best = best
+        if best is not None and float(best[1]) > self.Q_max:
+            self.best_tw, self.Q_max = float(best[0]), float(best[1])
+        self.topk_percent = float(topk_percent)
+        threshold = self.Q_max * (1 - self.topk_percent / 100.0)
+        self.top_idx = np.flatnonzero(self.Q_vals >= threshold)
+        self._text = None
+        self._extra = dict(extra or {})
+
+    def with_topk(self, topk_percent):
+        """Same sweep (and extra keys) with a different top-k% threshold."""
+        return SweepResult(self.Tw_vals, self.Q_vals, topk_percent, self._extra, self._best)
+
+    @property
+    def top_tw(self):
+        return self.Tw_vals[self.top_idx]
+
+    @property
+    def top_q(self):
+        return self.Q_vals[self.top_idx]
+
+    @property
+    def top_k_count(self):
+        return int(self.top_idx.size)
+
+    @property
+    def result_text(self):
+        if self._text is None:
+            head = self.top_idx[:5]
+            text = f"Best Design:\nTw = {self.best_tw:.4f} mm\nMax Q = {self.Q_max:.4f}\n"
+            text += f"\nTop-{self.topk_percent:.0f}% Region Candidates: {self.top_k_count}\n"
+            text += format_table([('Tw [mm]', self.Tw_vals[head]), ('Q', self.Q_vals[head])])
+            self._text = text
+        return self._text
+
+    @property
+    def top_k_df(self):
+        return self.to_dataframe()
+
+    def to_dataframe(self, top_only=True):
+        """pandas DataFrame with 'Tw [mm]' and 'Q' columns (the top-k% region by default)."""
+        import pandas as pd
+        idx = self.top_idx if top_only else slice(None)
+        return pd.DataFrame({'Tw [mm]': self.Tw_vals[idx], 'Q': self.Q_vals[idx]},
+                            index=self.top_idx if top_only else None)
+
+    def keys(self):
+        return list(self.KEYS) + list(self._extra)
+
+    def __getitem__(self, key):
+        if key in self._extra:
+            return self._extra[key]
+        if key in self.KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self.KEYS:
+            raise KeyError("%r is derived from the sweep and cannot be assigned" % key)
+        self._extra[key] = value
+
+    def __contains__(self, key):
+        return key in self._extra or key in self.KEYS
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __repr__(self):
+        return 'SweepResult(best_tw=%.4f, Q_max=%.4f, points=%d, top_k=%d)' % (
+            self.best_tw, self.Q_max, self.Q_vals.size, self.top_k_count)
+
+
+def format_table(columns):
+    """
+    Right-aligned text table without an index, formatted like
+    DataFrame.to_string(index=False) for plain float columns (pandas'
+    default precision of 6, including its switch to scientific notation).
+    """
+    cells = []
+    for name, values in columns:
+        strs = _format_floats(np.asarray(values, dtype=float))
+        # pandas leaves a sign slot in front of float column headers
+        width = max([len(name) + 1] + [len(s) for s in strs])
+        cells.append([name.rjust(width)] + [s.rjust(width) for s in strs])
+    return '\n'.join(' '.join(row) for row in zip(*cells))
+
+
+def _format_floats(values, digits=6):
+    """One column's cells the way pandas' FloatArrayFormatter writes them."""
+    nan = np.isnan(values)
+    strs = ['NaN' if m else '%.*f' % (digits, v) for v, m in zip(values, nan)]
+    # drop trailing zeros shared by every number in the column, keeping one decimal
+    while any(~nan) and all(s.endswith('0') for s, m in zip(strs, nan) if not m):
+        strs = [s if m else s[:-1] for s, m in zip(strs, nan)]
+    strs = [s + '0' if s.endswith('.') else s for s in strs]
+    abs_vals = np.abs(values[~nan])
+    has_small = np.any((abs_vals < 10.0 ** -digits) & (abs_vals > 0))
+    too_long = max([len(s) for s in strs] or [0]) > digits + 6
+    if has_small or (too_long and np.any(abs_vals > 1e6)):
+        strs = ['NaN' if m else '%.*e' % (digits, v) for v, m in zip(values, nan)]
+    return strs
+
+
+def refine_max(f, lo, hi, method='golden', tol=1e-4, coarse_points=21, n_starts=3):
+    """
+    Maximize f on [lo, hi]: coarse grid, then golden-section or Brent
+    refinement inside the bracket around the best grid point(s).
+    Returns (grid_x, grid_f, x_best, f_best); the refinement probes, which
+    cluster at the peak, are not part of the returned grid.
+    """
+    xs = np.linspace(lo, hi, int(coarse_points))
+    ys = f(xs)
+    step = xs[1] - xs[0]
+    if method == 'multistart':
+        starts = _local_maxima(ys)[:int(n_starts)]
+    else:
+        starts = np.array([int(np.nanargmax(ys))])
+    a = np.maximum(xs[starts] - step, lo)
+    b = np.minimum(xs[starts] + step, hi)
+
+    if method == 'brent':
+        seen_x, seen_y = [], []
+
+        def f_scalar(x):
+            y = float(f(x))
+            seen_x.append(x)
+            seen_y.append(y)
+            return y
+
+        for ai, bi in zip(a, b):
+            brent_max(f_scalar, ai, bi, tol=tol)
+        ext_x, ext_y = np.array(seen_x), np.array(seen_y)
+    else:
+        _, _, ext_x, ext_y = golden_section_max(f, a, b, tol=tol)
+
+    all_x = np.concatenate([xs, ext_x])
+    all_y = np.concatenate([ys, ext_y])
+    i = int(np.nanargmax(all_y))
+    return xs, ys, float(all_x[i]), float(all_y[i])
+
+
+def golden_section_max(f, a, b, tol=1e-4, max_iter=200):
+    """
+    Golden-section search for the maximum of f on each bracket [a_i, b_i].
+    All brackets advance together, so each iteration is a single f call on
+    an array of points. Returns (x_best, f_best, evaluated_x, evaluated_f).
+    """
+    a = np.array(a, dtype=float, ndmin=1)
+    b = np.array(b, dtype=float, ndmin=1)
+    k = a.size
+    c = b - INV_PHI * (b - a)
+    d = a + INV_PHI * (b - a)
+    fcd = f(np.concatenate([c, d]))
+    fc, fd = fcd[:k].copy(), fcd[k:].copy()
+    seen_x, seen_y = [c, d], [fc.copy(), fd.copy()]
+
+    for _ in range(max_iter):
+        active = (b - a) > tol
+        if not active.any():
+            break
+        left = active & (fc >= fd)
+        right = active & ~left
+        # keep [a, d] on the left branch, [c, b] on the right
+        b = np.where(left, d, b)
+        a = np.where(right, c, a)
+        new_x = np.where(left, b - INV_PHI * (b - a), a + INV_PHI * (b - a))
+        new_y = f(new_x[active])
+        seen_x.append(new_x[active])
+        seen_y.append(new_y)
+        y = np.full(k, np.nan)
+        y[active] = new_y
+        d, fd = np.where(left, c, d), np.where(left, fc, fd)
+        c, fc = np.where(right, d, c), np.where(right, fd, fc)
+        c, fc = np.where(left, new_x, c), np.where(left, y, fc)
+        d, fd = np.where(right, new_x, d), np.where(right, y, fd)
+
+    ev_x = np.concatenate(seen_x)
+    ev_y = np.concatenate(seen_y)
+    i = int(np.nanargmax(ev_y))
+    return ev_x[i], ev_y[i], ev_x, ev_y
+
+
+def brent_max(f, a, b, tol=1e-4, max_iter=100):
+    """
+    Brent's method (parabolic interpolation with golden-section fallback)
+    for the maximum of a scalar function f on [a, b]. Returns (x, f(x)).
+    """
+    cgold = 1.0 - INV_PHI
+    x = w = v = a + cgold * (b - a)
+    fx = fw = fv = -f(x)
+    d = e = 0.0
+    for _ in range(max_iter):
+        m = 0.5 * (a + b)
+        tol1 = 0.5 * tol + 1e-12
+        tol2 = 2.0 * tol1
+        if abs(x - m) <= tol2 - 0.5 * (b - a):
+            break
+        use_golden = True
+        if abs(e) > tol1:
+            # try a parabola through x, w, v
+            r = (x - w) * (fx - fv)
+            q = (x - v) * (fx - fw)
+            p = (x - v) * q - (x - w) * r
+            q = 2.0 * (q - r)
+            if q > 0.0:
+                p = -p
+            q = abs(q)
+            e_prev, e = e, d
+            if abs(p) < abs(0.5 * q * e_prev) and q * (a - x) < p < q * (b - x):
+                d = p / q
+                u = x + d
+                if u - a < tol2 or b - u < tol2:
+                    d = tol1 if x < m else -tol1
+                use_golden = False
+        if use_golden:
+            e = (a - x) if x >= m else (b - x)
+            d = cgold * e
+        u = x + d if abs(d) >= tol1 else x + (tol1 if d > 0 else -tol1)
+        fu = -f(u)
+        if fu <= fx:
+            if u >= x:
+                a = x
+            else:
+                b = x
+            v, w, x = w, x, u
+            fv, fw, fx = fw, fx, fu
+        else:
+            if u < x:
+                a = u
+            else:
+                b = u
+            if fu <= fw or w == x:
+                v, w = w, u
+                fv, fw = fw, fu
+            elif fu <= fv or v == x or v == w:
+                v, fv = u, fu
+    return x, -fx
+
+
+def projected_gradient_max(fg, x0, lo, hi, tol=1e-4, max_iter=100):
+    """
+    Batched projected gradient ascent inside the box [lo, hi]. fg maps a
+    (k, d) array of points to (f, df/dx) with shapes (k,) and (k, d). Each
+    row keeps its own step size: after an accepted (Armijo) step it is reset
+    to the Barzilai-Borwein estimate from the last two gradients, after a
+    rejected one it is halved. A row stops once its projected step moves
+    less than tol. Returns (x_best, f_best, evaluated_x, evaluated_f).
+    """
+    lo = np.asarray(lo, dtype=float)
+    hi = np.asarray(hi, dtype=float)
+    x = np.clip(np.array(x0, dtype=float, ndmin=2), lo, hi)
+    fx, g = fg(x)
+    seen_x, seen_f = [x.copy()], [fx.copy()]
+    # first trial step moves each row by a tenth of the smallest box side
+    step = 0.1 * np.min(hi - lo) / np.maximum(np.linalg.norm(g, axis=1), 1e-12)
+    active = np.ones(x.shape[0], dtype=bool)
+    for _ in range(int(max_iter)):
+        if not active.any():
+            break
+        rows = np.flatnonzero(active)
+        trial = np.clip(x[rows] + step[rows, None] * g[rows], lo, hi)
+        moved = trial - x[rows]
+        small = np.max(np.abs(moved), axis=1) < tol
+        active[rows[small]] = False
+        rows, trial, moved = rows[~small], trial[~small], moved[~small]
+        if rows.size == 0:
+            break
+        ft, gt = fg(trial)
+        seen_x.append(trial)
+        seen_f.append(ft)
+        ok = ft >= fx[rows] + 1e-4 * np.sum(g[rows] * moved, axis=1)
+        acc, rej = rows[ok], rows[~ok]
+        dg = gt[ok] - g[acc]
+        curv = -np.sum(moved[ok] * dg, axis=1)
+        # BB1 step s.s / -(s.y) where the objective curves downward, else grow
+        step[acc] = np.where(curv > 0, np.sum(moved[ok] ** 2, axis=1) / np.where(curv > 0, curv, 1.0),
+                             2.0 * step[acc])
+        x[acc], fx[acc], g[acc] = trial[ok], ft[ok], gt[ok]
+        step[rej] *= 0.5
+    best = int(np.nanargmax(fx))
+    return x[best], float(fx[best]), np.concatenate(seen_x), np.concatenate(seen_f)
+
+
+def sensitivity(model, freq, R, Lg, Ll, Tw):
+    """
+    Q and its partial derivatives at one design, from a single
+    predict_q_and_grad call. Returns a dict with 'Q', 'grad' (keyed by
+    GRAD_FEATURES, in Q per MHz or per mm) and a printable 'text'.
+    """
+    Q, grad = model.predict_q_and_grad(trace_width=Tw, frequency=freq, R=R, Lg=Lg, Ll=Ll)
+    grad = {name: float(v) + 0.0 for name, v in zip(GRAD_FEATURES, np.ravel(grad))}
+    text = "Sensitivity @ Tw = {:.4f} mm (Q = {:.4f}):\n".format(float(Tw), float(Q))
+    text += "\n".join("  dQ/d{:<4s} = {:+.6g} per {}".format(name, v, 'MHz' if name == 'freq' else 'mm')
+                       for name, v in grad.items())
+    return {'Q': float(Q), 'grad': grad, 'text': text}
+
+
+def _local_maxima(ys):
+    """Indices of interior/edge local maxima of ys, best first."""
+    ys = np.asarray(ys, dtype=float)
+    padded = np.concatenate([[-np.inf], ys, [-np.inf]])
+    peaks = np.flatnonzero((padded[1:-1] >= padded[:-2]) & (padded[1:-1] >= padded[2:]))
+    if peaks.size == 0:
+        peaks = np.array([int(np.nanargmax(ys))])
+    return peaks[np.argsort(-ys[peaks], kind='stable')]
+
+
+# reductions of Q over the (frequency x perturbation) axes in optimize_band
+ROBUST_OBJECTIVES = ('min', 'mean')
+
+
+def perturbations(R, Lg, Ll, tolerance=0.0, n_random=0, seed=0):
+    """
+    (S, 3) array of R/Lg/Ll samples: the nominal design first, then the 8
+    corners of the +-tolerance box (tolerance in mm, one value or one per
+    parameter) and n_random uniform draws inside it.
+    """
+    nominal = np.array([R, Lg, Ll], dtype=float)
+    tol = np.broadcast_to(np.abs(np.asarray(tolerance, dtype=float)), (3,))
+    if not np.any(tol):
+        return nominal[None, :]
+    corners = nominal + tol * np.array(list(itertools.product((-1.0, 1.0), repeat=3)))
+    draws = nominal + tol * np.random.default_rng(seed).uniform(-1.0, 1.0, (int(n_random), 3))
+    return np.vstack([nominal, corners, draws])
+
+
+def optimize_band(model, freqs, R, Lg, Ll, tolerance=0.0, objective='min', topk_percent=10,
+                  n_random=0, seed=0, Tw_vals=None):
+    """
+    Robust trace width over a frequency band and R/Lg/Ll tolerances.
+    Q is evaluated on the whole (Tw x frequency x perturbation) tensor with
+    one predict_batch call and reduced per Tw by objective: 'min' (worst
+    case) or 'mean'. Returns the SweepResult of the reduced scores; its
+    extra keys hold 'freq_range', the nominal curve 'Q_f' and the worst
+    case curve 'Q_f_worst' at the robust optimum, and a 'band_text' summary.
+    """
+    if objective not in ROBUST_OBJECTIVES:
+        raise ValueError("Unknown objective %r; expected one of %s" % (objective, ', '.join(ROBUST_OBJECTIVES)))
+    freqs = np.asarray(freqs, dtype=float).ravel()
+    Tw_vals = np.linspace(TW_MIN, TW_MAX, GRID_POINTS) if Tw_vals is None else np.asarray(Tw_vals, dtype=float)
+    pert = perturbations(R, Lg, Ll, tolerance, n_random, seed)
+    with profiling.stage('optimize.band'):
+        Q = model.predict_batch(trace_width=Tw_vals[:, None, None], frequency=freqs[None, :, None],
+                                R=pert[None, None, :, 0], Lg=pert[None, None, :, 1], Ll=pert[None, None, :, 2])
+        score = Q.min(axis=(1, 2)) if objective == 'min' else Q.mean(axis=(1, 2))
+    res = summarize_sweep(Tw_vals, score, topk_percent)
+    i = int(np.nanargmax(score))
+    res['freq_range'] = freqs
+    res['Q_f'] = Q[i, :, 0]
+    res['Q_f_worst'] = Q[i].min(axis=1)
+    res['perturbations'] = pert
+    res['band_text'] = "{} Q over {:g}-{:g} MHz ({} frequencies) and {} R/Lg/Ll perturbation(s): {:.4f}".format(
+        'Worst-case' if objective == 'min' else 'Mean', freqs.min(), freqs.max(), freqs.size, pert.shape[0],
+        res.Q_max)
+    return res
+
+
+# Geometry search space (mm), in the column order used by optimize_geometry
+GEOMETRY_PARAMS = ('Tw', 'R', 'Lg', 'Ll')
+DEFAULT_GEOMETRY_BOUNDS = {
+    'Tw': (TW_MIN, TW_MAX),
+    'R': (2.0, 12.0),
+    'Lg': (1.0, 6.0),
+    'Ll': (1.0, 10.0),
+}
+
+
+def gap_within_diameter(Tw, R, Lg, Ll):
+    """The leg gap has to fit inside the loop: Lg < 2R."""
+    return Lg < 2.0 * R
+
+
+DEFAULT_CONSTRAINTS = (gap_within_diameter,)
+
+
+def optimize_geometry(model, freq, bounds=None, constraints=DEFAULT_CONSTRAINTS, topk=10,
+                      popsize=64, generations=60, mutation=0.7, crossover=0.9, tol=1e-8, seed=None,
+                      polish=False, polish_starts=3, dedupe_tol=0.01):
+    """
+    Maximize Q over (Tw, R, Lg, Ll) at a fixed frequency with a batched
+    differential evolution (DE/rand/1/bin). Every generation is scored with
+    one predict_batch call. constraints are callables taking column arrays
+    (Tw, R, Lg, Ll) and returning a boolean feasibility mask; infeasible
+    designs are never selected. With polish=True the polish_starts best
+    designs are refined by projected gradient ascent on predict_q_and_grad;
+    polished points only count if they stay feasible. Returns the best
+    design and a ranked top_k_df of the best distinct designs seen: a design
+    within dedupe_tol (a fraction of each bound's range) of a better one in
+    every parameter is treated as a copy of it.
+    """
+    bounds = dict(DEFAULT_GEOMETRY_BOUNDS, **(bounds or {}))
+    lo = np.array([bounds[p][0] for p in GEOMETRY_PARAMS], dtype=float)
+    hi = np.array([bounds[p][1] for p in GEOMETRY_PARAMS], dtype=float)
+    rng = np.random.default_rng(seed)
+    popsize = max(int(popsize), 4)
+
+    def score(pop):
+        Tw, R, Lg, Ll = pop.T
+        q = np.asarray(model.predict_batch(trace_width=Tw, frequency=freq, R=R, Lg=Lg, Ll=Ll), dtype=float)
+        feasible = np.isfinite(q)
+        for constraint in constraints or ():
+            feasible &= np.asarray(constraint(Tw, R, Lg, Ll), dtype=bool)
+        return np.where(feasible, q, -np.inf)
+
+    pop = lo + rng.random((popsize, lo.size)) * (hi - lo)
+    fit = score(pop)
+    seen_x, seen_q = [pop], [fit]
+    n_evals = popsize
+    for _ in range(int(generations)):
+        # three distinct donors per member, none equal to the member itself
+        idx = np.argsort(rng.random((popsize, popsize - 1)), axis=1)[:, :3]
+        idx += idx >= np.arange(popsize)[:, None]
+        a, b, c = (pop[idx[:, j]] for j in range(3))
+        mutant = np.clip(a + mutation * (b - c), lo, hi)
+        cross = rng.random(pop.shape) < crossover
+        cross[np.arange(popsize), rng.integers(0, lo.size, popsize)] = True
+        trial = np.where(cross, mutant, pop)
+        trial_fit = score(trial)
+        n_evals += popsize
+        seen_x.append(trial)
+        seen_q.append(trial_fit)
+        better = trial_fit >= fit
+        pop[better] = trial[better]
+        fit[better] = trial_fit[better]
+        finite = fit[np.isfinite(fit)]
+        if finite.size == popsize and np.ptp(finite) <= tol * max(abs(finite.max()), 1.0):
+            break
+
+    if polish:
+        # Tw, R, Lg, Ll columns of the [freq, R, Lg, Ll, Tw] gradient
+        cols = [4, 1, 2, 3]
+
+        def fg(x):
+            Q, grad = model.predict_q_and_grad(trace_width=x[:, 0], frequency=freq, R=x[:, 1], Lg=x[:, 2], Ll=x[:, 3])
+            return Q, grad[:, cols]
+
+        starts = pop[np.argsort(-fit, kind='stable')[:int(polish_starts)]]
+        _, _, px, pq = projected_gradient_max(fg, starts, lo, hi, tol=1e-6)
+        feasible = np.isfinite(pq)
+        for constraint in constraints or ():
+            feasible &= np.asarray(constraint(*px.T), dtype=bool)
+        seen_x.append(px)
+        seen_q.append(np.where(feasible, pq, -np.inf))
+        n_evals += px.shape[0]
+
+    X = np.concatenate(seen_x)
+    Q = np.concatenate(seen_q)
+    ok = np.isfinite(Q)
+    X, Q = X[ok], Q[ok]
+    order = np.argsort(-Q, kind='stable')
+    # greedy, best first: keep a design, drop everything inside its tolerance box
+    box = float(dedupe_tol) * (hi - lo)
+    kept = []
+    while order.size and len(kept) < int(topk):
+        kept.append(order[0])
+        order = order[np.any(np.abs(X[order] - X[order[0]]) > box, axis=1)]
+    order = np.array(kept, dtype=np.intp)
+    import pandas as pd
+    top_k_df = pd.DataFrame({
+        'Tw [mm]': X[order, 0],
+        'R [mm]': X[order, 1],
+        'Lg [mm]': X[order, 2],
+        'Ll [mm]': X[order, 3],
+        'Q': Q[order],
+    })
+    if top_k_df.empty:
+        raise ValueError("No feasible design found within the given bounds and constraints")
+    best = {p: float(top_k_df.iloc[0, i]) for i, p in enumerate(GEOMETRY_PARAMS)}
+    best['Q'] = float(top_k_df.iloc[0]['Q'])
+    result_text = "Best Geometry @ {:.1f} MHz:\n".format(float(freq))
+    result_text += "Tw = {Tw:.4f} mm, R = {R:.4f} mm, Lg = {Lg:.4f} mm, Ll = {Ll:.4f} mm\nMax Q = {Q:.4f}\n".format(**best)
+    result_text += f"\nTop-{len(top_k_df)} Designs ({n_evals} evaluations):\n"
+    result_text += top_k_df.to_string(index=False)
+
+    return {
+        'best': best,
+        'Q_max': best['Q'],
+        'top_k_df': top_k_df,
+        'n_evals': n_evals,
+        'result_text': result_text
+    }
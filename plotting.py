@@ -0,0 +1,238 @@
+import os
+import numpy as np
+import profiling
+from matplotlib.patches import PathPatch, Rectangle
+from matplotlib.path import Path
+
+
+HEADLESS_FIGSIZE = (6, 4)
+HEADLESS_DPI = 150
+# fixed margins used instead of tight_layout in fast mode
+FAST_LAYOUT = dict(left=0.13, right=0.97, bottom=0.13, top=0.9)
+
+
+def _new_figure(dpi):
+    """Figure on its own Agg canvas; no pyplot global state involved."""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=HEADLESS_FIGSIZE, dpi=dpi)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _save(fig, path, fast):
+    if fast:
+        fig.savefig(path)
+    else:
+        fig.tight_layout(pad=0.5)
+        fig.savefig(path, bbox_inches='tight')
+    return path
+
+
+def render_q_vs_tw(path, Tw_vals, Q_vals, top_tw, top_q, topk, dpi=HEADLESS_DPI, fast=False):
+    fig = _new_figure(dpi)
+    if fast:
+        fig.subplots_adjust(**FAST_LAYOUT)
+    ax = fig.add_subplot(111)
+    if len(top_tw):
+        ax.plot(top_tw, top_q, marker='o', linestyle='-', color='blue')
+    else:
+        ax.plot(Tw_vals, Q_vals, marker='o', linestyle='-', color='blue')
+    ax.set_xlabel('Trace Width (Tw) [mm]')
+    ax.set_ylabel('Q Factor')
+    ax.set_title(f"Top-{float(topk):.0f}% Designs")
+    ax.grid(True)
+    return _save(fig, path, fast)
+
+
+def render_q_vs_freq(path, freq_range, Q_f, freq, Q_opt, best_tw, dpi=HEADLESS_DPI, fast=False, Q_f_worst=None):
+    fig = _new_figure(dpi)
+    if fast:
+        fig.subplots_adjust(**FAST_LAYOUT)
+    ax2 = fig.add_subplot(111)
+    ax2.plot(freq_range, Q_f, '-', label=f'Q vs Frequency @ Tw={best_tw:.3f}')
+    if Q_f_worst is not None:
+        ax2.plot(freq_range, Q_f_worst, '--', color='tab:red', label='Worst case (tolerances)')
+    ax2.axvline(freq, color='gray', linestyle='--', label='Input Frequency')
+    ax2.plot([freq], [Q_opt], 'o', color='blue', markersize=7, label='Optimized Point')
+    ax2.set_xlabel('Frequency [MHz]')
+    ax2.set_ylabel('Q Factor')
+    ax2.set_title('Q vs Frequency')
+    ax2.grid(True)
+    ax2.legend()
+    return _save(fig, path, fast)
+
+
+def render_coil(path, R, Lg, Ll, Tw, dpi=HEADLESS_DPI, fast=False):
+    if fast:
+        return export_coil(path, R, Lg, Ll, Tw, figsize=HEADLESS_FIGSIZE, dpi=dpi)
+    fig = _new_figure(dpi)
+    render_coil_axes(fig.add_subplot(111), R, Lg, Ll, Tw)
+    return _save(fig, path, fast)
+
+
+def frequency_sweep(freq, start=100.0, stop=800.0, num=800):
+    """
+    Frequency grid for the Q-vs-frequency plot with freq itself included, so
+    the optimized-point marker is read off the same sweep. Returns (grid, index of freq).
+    """
+    grid = np.union1d(np.linspace(start, stop, num), [float(freq)])
+    return grid, int(np.searchsorted(grid, float(freq)))
+
+
+def save_headless_plots(out_prefix, Tw_vals, Q_vals, top_tw, top_q, best_tw, freq, R, Lg, Ll, topk,
+                        freq_range, Q_f, Q_opt, dpi=HEADLESS_DPI, fast=False, executor=None, Q_f_worst=None):
+    """
+    Write the three headless PNGs (Q vs Tw, Q vs frequency, coil diagram)
+    from precomputed arrays; no model calls. fast=True uses a fixed layout
+    instead of tight_layout/bbox_inches='tight'. With an executor the three
+    figures are rendered concurrently. Q_f_worst adds a worst-case curve to
+    the frequency plot. Returns the three paths.
+    """
+    out1 = os.path.abspath(out_prefix + '_q_vs_tw.png')
+    out2 = os.path.abspath(out_prefix + '_q_vs_freq.png')
+    out3 = os.path.abspath(out_prefix + '_coil.png')
+    tasks = [
+        (render_q_vs_tw, (out1, Tw_vals, Q_vals, top_tw, top_q, topk, dpi, fast)),
+        (render_q_vs_freq, (out2, freq_range, Q_f, freq, Q_opt, best_tw, dpi, fast, Q_f_worst)),
+        (render_coil, (out3, R, Lg, Ll, best_tw, dpi, fast)),
+    ]
+    if executor is None:
+        paths = []
+        for fn, fn_args in tasks:
+            with profiling.stage('render.' + fn.__name__[len('render_'):]):
+                paths.append(fn(*fn_args))
+        return tuple(paths)
+    futures = [executor.submit(fn, *fn_args) for fn, fn_args in tasks]
+    return tuple(f.result() for f in futures)
+
+
+# unit circle sampled once; every coil render only scales it by R
+N_CIRCLE = 400
+_THETA = np.linspace(0, 2*np.pi, N_CIRCLE)
+_UNIT_CIRCLE = np.column_stack([np.cos(_THETA), np.sin(_THETA)])
+
+
+def _rect_path(rects):
+    """Compound Path of axis-aligned (x, y, w, h) rectangles."""
+    verts, codes = [], []
+    for x, y, w, h in rects:
+        verts += [(x, y), (x + w, y), (x + w, y + h), (x, y + h), (x, y)]
+        codes += [Path.MOVETO, Path.LINETO, Path.LINETO, Path.LINETO, Path.CLOSEPOLY]
+    return Path(verts, codes)
+
+
+class CoilRenderer:
+    """
+    Coil diagram on an Axes: complete circle on top + two separate vertical
+    legs extending down. The artists are created once; update() moves them
+    to a new (R, Lg, Ll, Tw) without clearing the axes.
+    """
+
+    def __init__(self, ax):
+        self.ax = ax
+        empty = Path(np.zeros((1, 2)))
+        self.trace, = ax.plot([], [], color='#333333', linewidth=2.0, solid_capstyle='round',
+                              solid_joinstyle='round', zorder=2)
+        self.legs = ax.add_patch(PathPatch(empty, facecolor='#333333', edgecolor='none', zorder=2))
+        self.cover = ax.add_patch(Rectangle((0, 0), 0, 0, facecolor='white', edgecolor='none', zorder=10))
+        # circle edge and the four leg sides as one compound path
+        self.outline = ax.add_patch(PathPatch(empty, facecolor='none', edgecolor='black', linewidth=1.4,
+                                              capstyle='round', joinstyle='round', zorder=4))
+
+        # Dimension labels
+        self.r_line, = ax.plot([], [], color='#FFD700', linestyle='--', linewidth=1.5, alpha=0.7, zorder=1)
+        self.r_text = ax.text(0, 0, '', fontsize=10, color='#FFD700', fontweight='bold', zorder=4)
+        self.lg_line, = ax.plot([], [], color='#A22B43', linewidth=1.2, alpha=0.7, zorder=1)
+        self.lg_text = ax.text(0, 0, '', fontsize=10, color='#A22B43', fontweight='bold', ha='center', zorder=4)
+        self.ll_text = ax.text(0, 0, '', fontsize=10, color='#4CAF50', fontweight='bold',
+                               ha='right', va='center', zorder=4)
+        self.tw_text = ax.text(0, 0, '', fontsize=10, color='#9C27B0', fontweight='bold',
+                               ha='left', va='center', zorder=4)
+
+        ax.set_aspect('equal')
+        ax.set_title('PCB Single Turn Tx Coil Geometry (mm)', fontsize=11, fontweight='bold')
+        ax.axis('off')
+
+    def update(self, R, Lg, Ll, Tw):
+        x_left = -Lg / 2.0
+        x_right = Lg / 2.0
+        circle = _UNIT_CIRCLE * R
+        notch_h = max(R * 0.15, Tw * 10.0)
+        leg_w = max(Tw * 30.0, 2.5)
+        if abs(x_left) < R:
+            notch_top = -np.sqrt(max(R**2 - x_left**2, 0.0))
+        else:
+            notch_top = -R
+        pad = 0.2
+        cut = ((circle[:, 0] >= (x_left - leg_w/2.0 - pad)) & (circle[:, 0] <= (x_right + leg_w/2.0 + pad))
+               & (circle[:, 1] <= notch_top))
+        if cut.any():
+            # start the arc right after the cut so it is one open polyline
+            start = int(np.flatnonzero(cut)[-1]) + 1
+            arc = np.roll(circle, -start, axis=0)[~np.roll(cut, -start)]
+        else:
+            arc = circle
+        self.trace.set_data(arc[:, 0], arc[:, 1])
+        self.trace.set_linewidth(max(Tw * 30, 2.0))
+
+        leg_top = notch_top - 0.01
+        leg_bottom_y = notch_top - Ll
+        self.legs.set_path(_rect_path([(x_left - leg_w/2.0, leg_bottom_y, leg_w, Ll),
+                                       (x_right - leg_w/2.0, leg_bottom_y, leg_w, Ll)]))
+        cover_h = max(0.6, notch_h * 0.6)
+        self.cover.set_bounds(x_left - leg_w, notch_top - cover_h/2.0, (x_right + leg_w) - (x_left - leg_w), cover_h)
+
+        sides = np.array([x_left - leg_w/2.0, x_left + leg_w/2.0, x_right - leg_w/2.0, x_right + leg_w/2.0])
+        seg_verts = np.empty((8, 2))
+        seg_verts[0::2, 0] = seg_verts[1::2, 0] = sides
+        seg_verts[0::2, 1] = leg_bottom_y
+        seg_verts[1::2, 1] = leg_top
+        verts = np.concatenate([arc, seg_verts])
+        codes = np.full(len(verts), Path.LINETO, dtype=Path.code_type)
+        codes[0] = Path.MOVETO
+        codes[len(arc)::2] = Path.MOVETO
+        self.outline.set_path(Path(verts, codes))
+
+        # R: radius label with dashed line to right side of circle (at top)
+        self.r_line.set_data([0, R*0.85], [R*0.5, R*0.5])
+        self.r_text.set_position((R*0.95, R*0.7))
+        self.r_text.set_text(f'R={R:.1f}')
+        # Lg: gap label at bottom of legs with dimension line
+        leg_bottom = -R - Ll
+        self.lg_line.set_data([x_left, x_right], [leg_bottom - 0.3, leg_bottom - 0.3])
+        self.lg_text.set_position((0, leg_bottom - 0.6))
+        self.lg_text.set_text(f'Lg={Lg:.1f} mm')
+        # Ll on the left of the legs, Tw on the right
+        leg_mid = (-R + (-R - Ll)) / 2
+        self.ll_text.set_position((x_left - 0.8, leg_mid))
+        self.ll_text.set_text(f'Ll={Ll:.1f} mm')
+        self.tw_text.set_position((x_right + 0.8, leg_mid))
+        self.tw_text.set_text(f'Tw={Tw:.3f} mm')
+
+        # Layout
+        self.ax.set_xlim(-R*1.3, R*1.4)
+        self.ax.set_ylim(-Ll - 0.8, R + 0.5)
+        return self
+
+
+def render_coil_axes(ax, R, Lg, Ll, Tw):
+    """Draw the coil geometry on ax; returns the CoilRenderer for later updates."""
+    return CoilRenderer(ax).update(R, Lg, Ll, Tw)
+
+
+def export_coil(path, R, Lg, Ll, Tw, figsize=(6, 4), dpi=150):
+    """
+    Write a coil diagram straight to path (format from the extension, e.g.
+    .png or .svg) with a fixed layout: no pyplot state, no tight_layout pass.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    render_coil_axes(ax, R, Lg, Ll, Tw)
+    # no tight_layout to pull the Lg label in, so make room for it in the view
+    ax.set_ylim(min(-Ll - 0.8, -R - Ll - 1.4), R + 0.5)
+    fig.savefig(path, dpi=dpi)
+    return path
@@ -0,0 +1,81 @@
+import time
+from collections import defaultdict
+
+# Instrumentation is off unless enable() is called (main.py --profile); when
+# off, stage() hands back a shared no-op context and count() returns at once.
+ENABLED = False
+
+_timers = defaultdict(lambda: [0, 0.0])
+_counters = defaultdict(int)
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        entry = _timers[self.name]
+        entry[0] += 1
+        entry[1] += time.perf_counter() - self.start
+        return False
+
+
+def enable(on=True):
+    global ENABLED
+    ENABLED = bool(on)
+
+
+def reset():
+    _timers.clear()
+    _counters.clear()
+
+
+def stage(name):
+    """Context manager timing one named stage (a no-op while disabled)."""
+    return _Stage(name) if ENABLED else _NULL_STAGE
+
+
+def count(name, n=1):
+    if ENABLED:
+        _counters[name] += n
+
+
+def snapshot():
+    """Copy of the current timers ({name: calls, total_s, mean_ms}) and counters."""
+    return {
+        'enabled': ENABLED,
+        'timers': {name: {'calls': calls, 'total_s': total, 'mean_ms': 1000.0 * total / calls if calls else 0.0}
+                   for name, (calls, total) in _timers.items()},
+        'counters': dict(_counters),
+    }
+
+
+def report(snap=None):
+    """Printable table of a snapshot, slowest stage first."""
+    snap = snap or snapshot()
+    lines = ['%-32s %8s %12s %10s' % ('stage', 'calls', 'total [ms]', 'mean [ms]')]
+    for name, t in sorted(snap['timers'].items(), key=lambda kv: -kv[1]['total_s']):
+        lines.append('%-32s %8d %12.3f %10.3f' % (name, t['calls'], 1000.0 * t['total_s'], t['mean_ms']))
+    if snap['counters']:
+        lines.append('')
+        lines.append('%-32s %8s' % ('counter', 'value'))
+        for name, value in sorted(snap['counters'].items()):
+            lines.append('%-32s %8d' % (name, value))
+    return '\n'.join(lines)
@@ -0,0 +1,224 @@
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from model_wrapper import MLQModel
+from lut import meta_path
+import profiling
+
+# directory holding the model and scaler files, overriding the defaults below
+MODEL_DIR_ENV = 'MLQ_MODEL_DIR'
+MODEL_FILE = 'best_model_3_Meta_raw_data.keras'
+SCALER_X_FILE = 'scaler_x.pkl'
+SCALER_Y_FILE = 'scaler_y.pkl'
+DEFAULT_MODEL_NAME = 'default'
+# seconds between the file checks made by get() and by the watcher thread
+DEFAULT_CHECK_INTERVAL = 2.0
+
+
+def default_model_dir():
+    """$MLQ_MODEL_DIR, else the PyInstaller bundle directory, else the directory of the app."""
+    path = os.environ.get(MODEL_DIR_ENV)
+    if path:
+        return path
+    if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
+        return sys._MEIPASS
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+def default_paths(model_dir=None):
+    """(model, scaler_x, scaler_y) paths of the standard file names in model_dir."""
+    model_dir = model_dir or default_model_dir()
+    return tuple(os.path.join(model_dir, f) for f in (MODEL_FILE, SCALER_X_FILE, SCALER_Y_FILE))
+
+
+def _file_state(paths):
+    """(mtime_ns, size) of each path, None for missing files."""
+    state = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            state.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            state.append(None)
+    return tuple(state)
+
+
+class _Entry:
+    __slots__ = ('name', 'kwargs', 'model', 'state', 'next_check', 'loaded_at', 'reloads', 'failed_reloads', 'lock')
+
+    def __init__(self, name, kwargs):
+        self.name = name
+        self.kwargs = kwargs
+        self.model = None
+        self.state = None
+        self.next_check = 0.0
+        self.loaded_at = None
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.lock = threading.Lock()
+
+    def unloaded(self, model):
+        """Configured files that model failed to load (model, scaler_x, scaler_y)."""
+        parts = (('model_path', 'model'), ('scaler_x_path', 'scaler_x'), ('scaler_y_path', 'scaler_y'))
+        return [self.kwargs[path] for path, attr in parts if self.kwargs.get(path) and getattr(model, attr) is None]
+
+    def paths(self):
+        paths = [self.kwargs.get(k) for k in ('model_path', 'scaler_x_path', 'scaler_y_path')]
+        if self.kwargs.get('backend') == 'lut' and paths[0]:
+            paths.append(meta_path(paths[0]))
+        return [p for p in paths if p]
+
+
+class ModelHandle:
+    """
+    Stand-in for the current MLQModel of one registry name: every attribute
+    lookup goes through registry.get(name), so a handle held by a server or
+    worker always reaches the latest loaded model.
+    """
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __getattr__(self, attr):
+        return getattr(self.registry.get(self.name), attr)
+
+
+class ModelRegistry:
+    """
+    Named model/scaler sets, each loaded once (and warmed up) and kept for
+    the life of the process. When a file of a set changes on disk, a new
+    MLQModel is built beside the old one and swapped in only if all of its
+    files loaded; callers already holding the old instance finish on it, so
+    in-flight requests are never dropped.
+    """
+
+    def __init__(self, check_interval=DEFAULT_CHECK_INTERVAL, warm=True):
+        self.check_interval = float(check_interval)
+        self.warm = warm
+        self._entries = {}
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def register(self, name, model_path=None, scaler_x_path=None, scaler_y_path=None, **model_kwargs):
+        """Load a named set now (MLQModel keyword arguments) and return its model."""
+        entry = _Entry(name, dict(model_kwargs, model_path=model_path, scaler_x_path=scaler_x_path,
+                                  scaler_y_path=scaler_y_path))
+        with entry.lock:
+            self._load(entry)
+        self._entries[name] = entry
+        return entry.model
+
+    def load_manifest(self, path, **defaults):
+        """
+        Register every set of a JSON manifest {name: {"model", "scaler_x",
+        "scaler_y", other MLQModel options}}; relative paths are taken from
+        the manifest's directory and defaults fill in missing options.
+        Returns the registered names.
+        """
+        base = os.path.dirname(os.path.abspath(path))
+        with open(path) as fh:
+            manifest = json.load(fh)
+        if not isinstance(manifest, dict):
+            raise ValueError("Model manifest must be a JSON object of named sets")
+        for name, spec in manifest.items():
+            spec = dict(defaults, **spec)
+            files = [spec.pop(k, None) for k in ('model', 'scaler_x', 'scaler_y')]
+            files = [os.path.join(base, f) if f else None for f in files]
+            self.register(name, *files, **spec)
+        return list(manifest)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def names(self):
+        return list(self._entries)
+
+    def handle(self, name=DEFAULT_MODEL_NAME):
+        if name not in self._entries:
+            raise KeyError("Unknown model %r" % name)
+        return ModelHandle(self, name)
+
+    def get(self, name=DEFAULT_MODEL_NAME):
+        """Current model of a name, reloading it first if its files changed."""
+        entry = self._entries[name]
+        if self._watcher is None and time.monotonic() >= entry.next_check:
+            self._check(entry)
+        return entry.model
+
+    def check(self):
+        """Reload every set whose files changed; returns the names reloaded."""
+        return [name for name, entry in list(self._entries.items()) if self._check(entry)]
+
+    def reload(self, name):
+        """Reload a set now, whether or not its files changed; True if swapped in."""
+        entry = self._entries[name]
+        with entry.lock:
+            return self._load(entry)
+
+    def _check(self, entry):
+        # a reload already running elsewhere keeps serving the current model
+        if not entry.lock.acquire(blocking=False):
+            return False
+        try:
+            entry.next_check = time.monotonic() + self.check_interval
+            if _file_state(entry.paths()) == entry.state:
+                return False
+            logging.info("Files of model %r changed; reloading", entry.name)
+            return self._load(entry)
+        finally:
+            entry.lock.release()
+
+    def _load(self, entry):
+        # state is taken before loading, so a write during the load triggers another reload
+        state = _file_state(entry.paths())
+        with profiling.stage('registry.load'):
+            model = MLQModel(**entry.kwargs)
+            if self.warm:
+                model.warmup()
+        entry.state = state
+        missing = entry.unloaded(model)
+        if missing and entry.model is not None:
+            # e.g. a file caught half-written; keep serving the old model until it changes again
+            entry.failed_reloads += 1
+            logging.warning("Reload of model %r failed to load %s; keeping the previously loaded model.",
+                            entry.name, ', '.join(missing))
+            return False
+        if entry.model is not None:
+            entry.reloads += 1
+            profiling.count('registry.reloads')
+        entry.model = model
+        entry.loaded_at = time.time()
+        return True
+
+    def start_watcher(self, interval=None):
+        """Check for changed files from a daemon thread instead of inside get()."""
+        if self._watcher is not None:
+            return
+        interval = self.check_interval if interval is None else float(interval)
+        self._stop.clear()
+
+        def watch():
+            while not self._stop.wait(interval):
+                try:
+                    self.check()
+                except Exception as e:
+                    logging.warning("Model reload check failed: %s", e)
+
+        self._watcher = threading.Thread(target=watch, name='mlq-model-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        if self._watcher is not None:
+            self._stop.set()
+            self._watcher.join()
+            self._watcher = None
+
+    def stats(self):
+        """Per-name load time, reload counts and model stats."""
+        return {name: dict(entry.model.stats(), loaded_at=entry.loaded_at, reloads=entry.reloads,
+                           failed_reloads=entry.failed_reloads)
+                for name, entry in self._entries.items()}
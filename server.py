@@ -0,0 +1,293 @@
+import json
+import time
+import asyncio
+import logging
+import numpy as np
+import profiling
+from concurrent.futures import ThreadPoolExecutor
+from optimizer import grid_maxima, TW_MIN, TW_MAX, GRID_POINTS
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# micro-batching: flush when this many rows are queued or the oldest request waited this long
+DEFAULT_MAX_BATCH = 8192
+DEFAULT_MAX_WAIT_MS = 5.0
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class MicroBatcher:
+    """
+    Collects (n, 5) sample blocks from concurrent requests and evaluates them
+    together with one MLQModel.predict_batch call per batch. Model calls run
+    on a single worker thread so the event loop stays responsive.
+    """
+
+    def __init__(self, model, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.model = model
+        self.max_batch = int(max_batch)
+        self.max_wait = float(max_wait_ms) / 1000.0
+        self.queue = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.batches = 0
+        self.rows = 0
+        self.requests = 0
+
+    async def predict(self, samples):
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((samples, fut))
+        return await fut
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            n_rows = items[0][0].shape[0]
+            deadline = loop.time() + self.max_wait
+            while n_rows < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                items.append(item)
+                n_rows += item[0].shape[0]
+            X = np.concatenate([s for s, _ in items], axis=0)
+            try:
+                Q = await loop.run_in_executor(self.executor, self.model.predict_batch, X)
+            except Exception as e:
+                for _, fut in items:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            self.batches += 1
+            self.rows += X.shape[0]
+            self.requests += len(items)
+            start = 0
+            # fan results back out in submission order
+            for samples, fut in items:
+                end = start + samples.shape[0]
+                if not fut.done():
+                    fut.set_result(Q[start:end])
+                start = end
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'rows': self.rows,
+            'requests': self.requests,
+            'mean_batch_rows': self.rows / self.batches if self.batches else 0.0,
+        }
+
+
+def _design_samples(payload, trace_width):
+    """(n, 5) samples for one request, broadcasting scalars against lists."""
+    cols = [payload['freq'], payload['R'], payload['Lg'], payload['Ll'], trace_width]
+    cols = np.broadcast_arrays(*[np.asarray(c, dtype=float) for c in cols])
+    return np.stack([c.ravel() for c in cols], axis=1)
+
+
+class MLQServer:
+    """Minimal HTTP/1.1 JSON API over a warm MLQModel with request micro-batching."""
+
+    def __init__(self, model, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS, registry=None):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        # created in serve(), so its queue belongs to the running event loop
+        self.batcher = None
+        # with a ModelRegistry, a request's optional 'model' picks a named set,
+        # each with its own micro-batcher (started on first use)
+        self.registry = registry
+        self.batchers = {}
+        self._tasks = []
+        self.Tw_vals = np.linspace(TW_MIN, TW_MAX, GRID_POINTS)
+
+    def _batcher(self, payload):
+        name = payload.get('model')
+        if name is None:
+            return self.batcher
+        if self.registry is None or name not in self.registry:
+            raise ValueError("unknown model %r" % (name,))
+        batcher = self.batchers.get(name)
+        if batcher is None:
+            batcher = self.batchers[name] = MicroBatcher(self.registry.handle(name), self.max_batch, self.max_wait_ms)
+            self._tasks.append(asyncio.create_task(batcher.run()))
+        return batcher
+
+    async def handle_predict(self, payload):
+        tw = payload.get('tw', payload.get('trace_width'))
+        if tw is None:
+            raise ValueError("predict needs 'tw'")
+        samples = _design_samples(payload, tw)
+        Q = await self._batcher(payload).predict(samples)
+        return {'Q': Q.tolist()}
+
+    async def handle_optimize(self, payload):
+        topk = float(payload.get('topk', 10))
+        Q = await self._batcher(payload).predict(_design_samples(payload, self.Tw_vals))
+        idx, Q_max, in_region = grid_maxima(Q.reshape(1, -1), topk)
+        if idx[0] < 0:
+            raise RuntimeError("model returned no finite Q over the Tw grid")
+        idx, Q_max, in_region = int(idx[0]), float(Q_max[0]), in_region[0]
+        return {
+            'best_tw': float(self.Tw_vals[idx]),
+            'Q_max': Q_max,
+            'topk_count': int(in_region.sum()),
+            'top_k': [[float(t), float(q)] for t, q in zip(self.Tw_vals[in_region], Q[in_region])],
+        }
+
+    async def dispatch(self, method, path, body):
+        if method == 'GET' and path == '/health':
+            health = dict(self.batcher.stats(), status='ok', model=self.model.stats())
+            if self.registry is not None:
+                health['models'] = self.registry.stats()
+            if profiling.ENABLED:
+                health['profile'] = profiling.snapshot()
+            return 200, health
+        if method != 'POST' or path not in ('/predict', '/optimize'):
+            return 404, {'error': 'unknown endpoint %s %s' % (method, path)}
+        try:
+            payload = json.loads(body or b'{}')
+            if not isinstance(payload, dict):
+                raise ValueError("request body must be a JSON object")
+            if path == '/predict':
+                return 200, await self.handle_predict(payload)
+            return 200, await self.handle_optimize(payload)
+        except (KeyError, ValueError, TypeError) as e:
+            return 400, {'error': '%s: %s' % (type(e).__name__, e)}
+        except Exception as e:
+            logging.exception("Request failed")
+            return 500, {'error': str(e)}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode('latin-1').split()
+                if len(parts) < 2:
+                    break
+                method, path = parts[0].upper(), parts[1]
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0) or 0)
+                if length > MAX_BODY_BYTES:
+                    status, result = 413, {'error': 'body too large'}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, result = await self.dispatch(method, path, body)
+                    keep_alive = headers.get('connection', '').lower() != 'close'
+                data = json.dumps(result).encode()
+                writer.write(('HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n'
+                              'Connection: %s\r\n\r\n' % (status, REASONS.get(status, ''), len(data),
+                                                          'keep-alive' if keep_alive else 'close')).encode('latin-1'))
+                writer.write(data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        self.batcher = MicroBatcher(self.model, self.max_batch, self.max_wait_ms)
+        self._tasks.append(asyncio.create_task(self.batcher.run()))
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_connection, path=unix_path)
+            print('Serving on unix socket', unix_path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+            print('Serving on http://%s:%d' % (host, port))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in self._tasks:
+                task.cancel()
+
+
+def run_server(model, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None,
+               max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS, registry=None):
+    server = MLQServer(model, max_batch, max_wait_ms, registry)
+    try:
+        asyncio.run(server.serve(host, port, unix_path))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _open(host, port, unix_path):
+    if unix_path:
+        return await asyncio.open_unix_connection(unix_path)
+    return await asyncio.open_connection(host, port)
+
+
+async def _post(reader, writer, path, payload):
+    body = json.dumps(payload).encode()
+    writer.write(('POST %s HTTP/1.1\r\nHost: mlq\r\nContent-Type: application/json\r\n'
+                  'Content-Length: %d\r\n\r\n' % (path, len(body))).encode('latin-1') + body)
+    await writer.drain()
+    status_line = await reader.readline()
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        key, _, value = line.decode('latin-1').partition(':')
+        if key.strip().lower() == 'content-length':
+            length = int(value.strip())
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def replay_jsonl(in_path, out_path=None, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None,
+                       concurrency=32):
+    """
+    Send every JSON line of in_path to the server over `concurrency` keep-alive
+    connections. A line's 'op' ('predict' or 'optimize', default 'optimize')
+    picks the endpoint; the rest of the object is the request body. Responses
+    are written to out_path in input order. Returns (n_requests, seconds).
+    """
+    with open(in_path) as fh:
+        jobs = [line for line in (l.strip() for l in fh) if line]
+    results = [None] * len(jobs)
+    next_job = iter(range(len(jobs)))
+
+    async def worker():
+        reader, writer = await _open(host, port, unix_path)
+        try:
+            for i in next_job:
+                try:
+                    payload = json.loads(jobs[i])
+                    op = payload.pop('op', 'optimize') if isinstance(payload, dict) else 'optimize'
+                    status, body = await _post(reader, writer, '/' + op, payload)
+                except ValueError as e:
+                    status, body = 400, {'error': 'invalid JSON line: %s' % e}
+                results[i] = {'line': i + 1, 'status': status, 'response': body}
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(max(1, min(int(concurrency), len(jobs))))])
+    elapsed = time.perf_counter() - start
+    if out_path:
+        with open(out_path, 'w') as fh:
+            for r in results:
+                fh.write(json.dumps(r) + '\n')
+    return len(jobs), elapsed
+
+
+def run_replay(in_path, out_path=None, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None, concurrency=32):
+    n, elapsed = asyncio.run(replay_jsonl(in_path, out_path, host, port, unix_path, concurrency))
+    print('Replayed %d requests in %.3f s (%.1f req/s)' % (n, elapsed, n / elapsed if elapsed > 0 else 0.0))
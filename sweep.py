@@ -0,0 +1,220 @@
+import os
+import csv
+import logging
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from model_wrapper import MLQModel
+from optimizer import optimize_compute, grid_optimize
+
+SCENARIO_COLUMNS = ['freq', 'R', 'Lg', 'Ll']
+RESULT_COLUMNS = SCENARIO_COLUMNS + ['best_tw', 'Q_max', 'topk_count']
+DEFAULT_SHARD_SIZE = 2000
+
+# set once per worker process by _init_worker
+_WORKER_MODEL = None
+
+
+def parse_axis(spec):
+    """
+    Parse one grid axis: 'start:stop:num' for an inclusive linspace,
+    or a comma-separated list of values ('6' is a single value).
+    """
+    spec = str(spec).strip()
+    if ':' in spec:
+        start, stop, num = spec.split(':')
+        return np.linspace(float(start), float(stop), int(num))
+    return np.array([float(v) for v in spec.split(',') if v.strip()], dtype=float)
+
+
+def grid_shards(axes, shard_size, done=()):
+    """Yield (shard_id, rows) over the product of axes, skipping shard ids in done."""
+    shape = tuple(len(a) for a in axes)
+    total = int(np.prod(shape))
+    for shard_id, start in enumerate(range(0, total, shard_size)):
+        if shard_id in done:
+            continue
+        flat = np.arange(start, min(start + shard_size, total))
+        idx = np.unravel_index(flat, shape)
+        yield shard_id, np.column_stack([axes[i][idx[i]] for i in range(len(axes))])
+
+
+def csv_shards(path, shard_size, done=()):
+    """Yield (shard_id, rows) from a CSV with freq,R,Lg,Ll columns, streamed shard by shard."""
+    with open(path, newline='') as fh:
+        reader = csv.DictReader(fh)
+        missing = [c for c in SCENARIO_COLUMNS if c not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError("Scenario CSV %s is missing columns: %s" % (path, ', '.join(missing)))
+        shard_id, count, rows = 0, 0, []
+        for row in reader:
+            if shard_id not in done:
+                rows.append([float(row[c]) for c in SCENARIO_COLUMNS])
+            count += 1
+            if count == shard_size:
+                if rows:
+                    yield shard_id, np.array(rows, dtype=float)
+                shard_id, count, rows = shard_id + 1, 0, []
+        if rows:
+            yield shard_id, np.array(rows, dtype=float)
+
+
+def optimize_rows(model, rows, topk_percent=10, method='grid', tol=1e-4):
+    """
+    optimize_compute for each (freq, R, Lg, Ll) row. The default grid method
+    is evaluated for the whole block in one predict_batch call.
+    Returns an (n, 7) array laid out as RESULT_COLUMNS.
+    """
+    out = np.empty((rows.shape[0], len(RESULT_COLUMNS)), dtype=float)
+    out[:, :4] = rows
+    if method == 'grid':
+        Tw_vals, _, idx, Q_max, region = grid_optimize(model, rows, topk_percent)
+        # rows without a finite Q get NaN best_tw/Q_max and a zero count
+        out[:, 4] = np.where(idx >= 0, Tw_vals[idx], np.nan)
+        out[:, 5] = Q_max
+        out[:, 6] = region.sum(axis=1)
+        return out
+    for i, (fr, R, Lg, Ll) in enumerate(rows):
+        res = optimize_compute(model, fr, R, Lg, Ll, topk_percent, method=method, tol=tol)
+        out[i, 4:] = res.best_tw, res.Q_max, res.top_k_count
+    return out
+
+
+def _init_worker(model_kwargs):
+    global _WORKER_MODEL
+    _WORKER_MODEL = MLQModel(**model_kwargs)
+
+
+def _run_shard(shard_id, rows, topk_percent, method, tol):
+    return shard_id, optimize_rows(_WORKER_MODEL, rows, topk_percent, method, tol)
+
+
+class CsvSink:
+    """
+    Appends result rows to one CSV. The checkpoint file records, per finished
+    shard, the file size after its rows were written; on resume the CSV is cut
+    back to the last recorded size so a partially written shard is redone.
+    """
+
+    def __init__(self, path, resume=True):
+        self.path = path
+        self.ckpt_path = path + '.ckpt'
+        self.done = set()
+        offset = 0
+        if resume and os.path.exists(self.ckpt_path) and os.path.exists(path):
+            with open(self.ckpt_path) as fh:
+                for line in fh:
+                    parts = line.split()
+                    if len(parts) == 2:
+                        self.done.add(int(parts[0]))
+                        offset = max(offset, int(parts[1]))
+        if self.done:
+            self.fh = open(path, 'r+', newline='')
+            self.fh.truncate(offset)
+            self.fh.seek(offset)
+            self.ckpt = open(self.ckpt_path, 'a')
+        else:
+            self.fh = open(path, 'w', newline='')
+            self.ckpt = open(self.ckpt_path, 'w')
+            csv.writer(self.fh).writerow(RESULT_COLUMNS)
+        self.writer = csv.writer(self.fh)
+
+    def write(self, shard_id, results):
+        # topk_count is a count; keep it out of the float formatting
+        self.writer.writerows(row[:-1] + [int(row[-1])] for row in results.tolist())
+        self.fh.flush()
+        os.fsync(self.fh.fileno())
+        self.ckpt.write('%d %d\n' % (shard_id, self.fh.tell()))
+        self.ckpt.flush()
+        self.done.add(shard_id)
+
+    def close(self):
+        self.fh.close()
+        self.ckpt.close()
+
+
+class ParquetSink:
+    """One parquet part file per shard in a directory; finished parts are the checkpoint."""
+
+    def __init__(self, path, resume=True):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except Exception as e:
+            raise RuntimeError("Parquet output requires pyarrow: %s" % e)
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.done = set()
+        for name in os.listdir(path):
+            if name.startswith('part-') and name.endswith('.parquet'):
+                if resume:
+                    self.done.add(int(name[5:-8]))
+                else:
+                    os.remove(os.path.join(path, name))
+
+    def write(self, shard_id, results):
+        table = self.pa.table({c: results[:, i].astype(np.int64) if c == 'topk_count' else results[:, i]
+                               for i, c in enumerate(RESULT_COLUMNS)})
+        final = os.path.join(self.path, 'part-%08d.parquet' % shard_id)
+        self.pq.write_table(table, final + '.tmp')
+        os.replace(final + '.tmp', final)
+        self.done.add(shard_id)
+
+    def close(self):
+        pass
+
+
+def open_sink(path, resume=True):
+    if path.endswith('.parquet'):
+        return ParquetSink(path, resume)
+    return CsvSink(path, resume)
+
+
+def run_sweep(out_path, model_kwargs, axes=None, scenarios_csv=None, topk_percent=10, method='grid',
+              tol=1e-4, workers=None, shard_size=DEFAULT_SHARD_SIZE, resume=True, progress=print):
+    """
+    Run optimize_compute over a (freq, R, Lg, Ll) grid or a scenario CSV with a
+    process pool. Each worker loads MLQModel(**model_kwargs) once; finished
+    shards are streamed to out_path (CSV, or a directory of parquet parts when
+    it ends in .parquet) and checkpointed so a killed run resumes where it
+    stopped. Returns the number of shards computed in this run.
+    """
+    if (axes is None) == (scenarios_csv is None):
+        raise ValueError("Pass exactly one of axes or scenarios_csv")
+    shard_size = max(int(shard_size), 1)
+    workers = max(int(workers or os.cpu_count() or 1), 1)
+    sink = open_sink(out_path, resume)
+    if sink.done:
+        progress('Resuming: %d shards already done' % len(sink.done))
+    if axes is not None:
+        shards = grid_shards([np.asarray(a, dtype=float) for a in axes], shard_size, sink.done)
+    else:
+        shards = csv_shards(scenarios_csv, shard_size, sink.done)
+
+    computed = 0
+    pending = set()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model_kwargs,)) as pool:
+            for shard_id, rows in shards:
+                # keep a bounded number of shards in flight
+                while len(pending) >= 2 * workers:
+                    computed += _drain(sink, pending, progress)
+                pending.add(pool.submit(_run_shard, shard_id, rows, topk_percent, method, tol))
+            while pending:
+                computed += _drain(sink, pending, progress)
+    finally:
+        sink.close()
+    return computed
+
+
+def _drain(sink, pending, progress):
+    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for fut in finished:
+        pending.discard(fut)
+        shard_id, results = fut.result()
+        sink.write(shard_id, results)
+        logging.info("Shard %d done (%d rows)", shard_id, len(results))
+    progress('Shards done: %d' % len(sink.done))
+    return len(finished)
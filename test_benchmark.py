@@ -0,0 +1,33 @@
+import numpy as np
+from benchmark import compare, time_call
+
+
+def _report(seconds):
+    return {'results': {k: {'seconds': s} for k, s in seconds.items()}, 'peak_rss_mb': {}}
+
+
+def test_identical_report_never_fails():
+    seconds = {'inference numpy n=1': 4e-5, 'inference numpy n=1000000': 2.5, 'render': 0.0}
+    report = _report(seconds)
+    assert compare(report, report) == []
+    assert compare(report, report, threshold=0.0) == []
+
+
+def test_sub_ms_jitter_is_not_a_regression():
+    # +47% of a few tens of microseconds is noise
+    assert compare(_report({'a': 5.9e-5}), _report({'a': 4e-5})) == []
+    problems = compare(_report({'a': 0.5, 'b': 5.9e-3}), _report({'a': 0.3, 'b': 4e-3}))
+    assert [p.split(':')[0] for p in problems] == ['a', 'b']
+
+
+def test_rerun_of_a_short_call_passes():
+    x = np.random.default_rng(0).random(1000)
+    run = lambda: _report({'sum': time_call(x.sum)})
+    assert compare(run(), run()) == []
+
+
+if __name__ == "__main__":
+    test_identical_report_never_fails()
+    test_sub_ms_jitter_is_not_a_regression()
+    test_rerun_of_a_short_call_passes()
+    print("benchmark ok")
@@ -0,0 +1,44 @@
+import numpy as np
+from optimizer import format_table, optimize_compute
+from model_wrapper import MLQModel
+
+CASES = [
+    [0.1, 0.2, 0.3],
+    [130.336321, 128.5, 127.25],
+    [1e-7, 2.0],
+    [np.nan, 1.5, 2.25],
+    [np.nan, np.nan],
+    [1e7, 2.5],
+    [1e7, 1.123456789],
+    [-1.5, 2.0],
+    [0.0, 1.0],
+    [123456.789, 1.0],
+    [5e-7, np.nan, 3.0],
+]
+
+
+def _pandas_table(values):
+    import pandas as pd
+    return pd.DataFrame({'Tw [mm]': values, 'Q': values[::-1]}).to_string(index=False)
+
+
+def test_matches_pandas():
+    rng = np.random.default_rng(0)
+    cases = CASES + [list(rng.uniform(0.1, 10.0, 5).round(d)) for d in range(7)]
+    cases += [list(rng.uniform(-1e3, 1e3, 4)) for _ in range(5)]
+    for values in cases:
+        values = np.array(values, dtype=float)
+        ours = format_table([('Tw [mm]', values), ('Q', values[::-1])])
+        assert ours == _pandas_table(values), (values, ours, _pandas_table(values))
+
+
+def test_result_text_matches_dataframe():
+    res = optimize_compute(MLQModel(), 400.0, 6.0, 5.0, 10.0, 30)
+    table = res.result_text.split('\n', 5)[5]
+    assert table == res.top_k_df.head().to_string(index=False)
+
+
+if __name__ == "__main__":
+    test_matches_pandas()
+    test_result_text_matches_dataframe()
+    print("format_table ok")
@@ -0,0 +1,37 @@
+import os
+import json
+import tempfile
+import numpy as np
+from model_wrapper import MLQModel
+from jobs import run_jobs
+
+
+class NanAbove600(MLQModel):
+    """Fallback model that returns NaN for every frequency above 600 MHz."""
+
+    def predict_batch(self, X=None, trace_width=None, frequency=None, R=None, Lg=None, Ll=None, **kwargs):
+        Q = super().predict_batch(X, trace_width, frequency, R, Lg, Ll, **kwargs)
+        return np.where(np.broadcast_to(frequency, Q.shape) > 600, np.nan, Q)
+
+
+def test_nan_job_gets_error_record():
+    tmp = tempfile.mkdtemp()
+    in_path, out_path = os.path.join(tmp, 'jobs.jsonl'), os.path.join(tmp, 'out.jsonl')
+    with open(in_path, 'w') as fh:
+        fh.write('{"freq": 400, "R": 6, "Lg": 5, "Ll": 10}\n')
+        fh.write('{"freq": 700, "R": 6, "Lg": 5, "Ll": 10}\n')
+        fh.write('not json\n')
+        fh.write('{"freq": 300, "R": 6, "Lg": 5, "Ll": 10, "topk": 5}\n')
+    assert run_jobs(NanAbove600(), in_path, out_path) == 2
+    with open(out_path) as fh:
+        results = [json.loads(line) for line in fh]
+    assert [r['line'] for r in results] == [1, 2, 3, 4]
+    assert 'error' not in results[0] and 'error' not in results[3]
+    assert 'finite Q' in results[1]['error']
+    assert 'error' in results[2]
+    assert len(results[0]['candidates']) == min(results[0]['topk_count'], 10)
+
+
+if __name__ == "__main__":
+    test_nan_job_gets_error_record()
+    print("jobs ok")
@@ -0,0 +1,46 @@
+import numpy as np
+import main
+
+
+def _sweep_call(argv, monkeypatch):
+    calls = []
+    monkeypatch.setattr(main, 'run_sweep', lambda out, kwargs, **kw: calls.append(kw))
+    main.run_sweep_command(main.build_parser().parse_args(argv))
+    return calls[0]
+
+
+def test_sweep_keeps_global_options(monkeypatch):
+    kw = _sweep_call(['--topk', '20', '--freq', '450', 'sweep'], monkeypatch)
+    assert kw['topk_percent'] == 20
+    assert np.array_equal(kw['axes'][0], [450.0])
+    assert np.array_equal(kw['axes'][1], [6.0])
+
+
+def test_sweep_options_override_global(monkeypatch):
+    kw = _sweep_call(['--topk', '20', 'sweep', '--topk', '5', '--R', '4:8:3'], monkeypatch)
+    assert kw['topk_percent'] == 5
+    assert np.array_equal(kw['axes'][1], [4.0, 6.0, 8.0])
+
+
+def _batch_plot_workers(argv, monkeypatch):
+    calls = []
+    monkeypatch.setattr(main, 'MLQModel', lambda **kw: None)
+    monkeypatch.setattr(main, 'run_jobs', lambda *a, **kw: calls.append(kw) or 0)
+    main.run_command(main.build_parser().parse_args(argv))
+    return calls[0]['plot_workers']
+
+
+def test_batch_plot_workers(monkeypatch):
+    assert _batch_plot_workers(['--plot-workers', '3', 'batch', 'jobs.jsonl'], monkeypatch) == 3
+    assert _batch_plot_workers(['batch', 'jobs.jsonl', '--plot-workers', '2'], monkeypatch) == 2
+    assert _batch_plot_workers(['batch', 'jobs.jsonl'], monkeypatch) is None
+
+
+def test_table_axes_keep_global_options():
+    args = main.build_parser().parse_args(['--freq', '450', 'table', '--freq', '300:500:3'])
+    assert args.freq == '450' and args.table_freq == '300:500:3'
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, '-q']))
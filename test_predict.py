@@ -1,3 +1,4 @@
+import numpy as np
 from model_wrapper import MLQModel
 
 if __name__ == "__main__":
@@ -9,3 +10,55 @@ if __name__ == "__main__":
     print("prediction shape:", getattr(pred, 'shape', None))
     print(pred)
 
+
+    # many geometries in one call
+    Rs = np.array([5.0, 6.0, 7.0])
+    batch = m.predict_batch(trace_width=2.0, frequency=fr, R=Rs, Lg=Lg, Ll=Ll)
+    print("batch shape:", batch.shape)
+    print(batch)
+
+    # broadcast keyword grids, chunked, match the explicit (N, 5) sample matrix
+    fr_g, tw_g = np.linspace(300.0, 500.0, 7)[:, None, None], np.linspace(0.5, 8.0, 11)[None, :, None]
+    grid = m.predict_batch(trace_width=tw_g, frequency=fr_g, R=Rs, Lg=Lg, Ll=Ll, batch_size=17)
+    X_g = np.stack([c.ravel() for c in np.broadcast_arrays(fr_g, Rs, Lg, Ll, tw_g)], axis=1)
+    assert np.allclose(grid, m.predict_batch(X_g).reshape(grid.shape)), grid.shape
+
+    # NumPy backend against the Keras model, when both can be loaded
+    model_path = "best_model_3_Meta_raw_data.keras"
+    m_tf = MLQModel(model_path, "scaler_x.pkl", "scaler_y.pkl", backend='tf')
+    m_np = MLQModel(model_path, "scaler_x.pkl", "scaler_y.pkl", backend='numpy')
+    if m_tf.model is not None and m_np.model is not None:
+        tw_sweep = np.linspace(0.1, 10.0, 100)
+        diff = np.abs(m_tf.predict_q(tw_sweep, fr, R, Lg, Ll) - m_np.predict_q(tw_sweep, fr, R, Lg, Ll))
+        assert np.allclose(diff, 0.0, atol=1e-3), diff.max()
+        print("tf vs numpy max abs diff:", diff.max())
+
+    # scalers folded into the weights must match the separate transform pipeline
+    m_fold = MLQModel(model_path, "scaler_x.pkl", "scaler_y.pkl", backend='numpy', fold_scalers=True)
+    if m_np.model is not None and m_fold.scalers_folded:
+        X = np.column_stack([
+            np.linspace(100.0, 700.0, 50), np.full(50, R), np.full(50, Lg), np.full(50, Ll), np.linspace(0.1, 10.0, 50)
+        ])
+        ref = m_np.predict_batch(X)
+        folded = m_fold.predict_batch(X)
+        assert np.allclose(folded, ref, rtol=1e-9, atol=1e-9), np.abs(folded - ref).max()
+        print("folded vs unfolded max abs diff:", np.abs(folded - ref).max())
+
+    # backpropagated gradients against central differences
+    for model in (m, m_np):
+        if model is m_np and m_np.model is None:
+            continue
+        X = np.array([[400.0, R, Lg, Ll, 2.0], [250.0, 4.0, 2.0, 2.0, 5.0]])
+        Q, grad = model.predict_q_and_grad(X)
+        h = 1e-5
+        fd = np.stack([(model.predict_batch(X + h * e) - model.predict_batch(X - h * e)) / (2 * h)
+                       for e in np.eye(5)], axis=1)
+        assert np.allclose(grad, fd, rtol=1e-5, atol=1e-6), np.abs(grad - fd).max()
+        print("gradient vs finite difference max abs diff:", np.abs(grad - fd).max())
+
+    # float32 inference stays close to float64
+    m_32 = MLQModel(model_path, "scaler_x.pkl", "scaler_y.pkl", backend='numpy', fold_scalers=True, dtype='float32')
+    if m_32.model is not None:
+        report = m_32.precision_report()
+        assert report['max_abs'] < 1e-2, report
+        print("float32 vs float64 max abs diff:", report['max_abs'])
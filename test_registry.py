@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+from registry import ModelRegistry, default_paths
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _registry():
+    tmp = tempfile.mkdtemp()
+    for src in default_paths(HERE):
+        shutil.copy(src, tmp)
+    reg = ModelRegistry(check_interval=0.0, warm=False)
+    reg.register('a', *default_paths(tmp), backend='numpy')
+    return reg, default_paths(tmp)
+
+
+def _q(model):
+    return model.predict_batch(trace_width=[0.5, 2.0, 8.0], frequency=400.0, R=6.0, Lg=5.0, Ll=10.0)
+
+
+def test_corrupt_scaler_keeps_old_model():
+    reg, (_, scaler_x, _) = _registry()
+    old = reg.get('a')
+    assert old.model is not None and old.scaler_x is not None
+    ref = _q(old)
+    good = open(scaler_x, 'rb').read()
+    with open(scaler_x, 'wb') as fh:
+        fh.write(good[:len(good) // 2])
+    assert reg.check() == []
+    assert reg.get('a') is old
+    assert np.array_equal(_q(reg.get('a')), ref)
+    stats = reg.stats()['a']
+    assert stats['reloads'] == 0 and stats['failed_reloads'] == 1
+
+    # the finished write is picked up
+    with open(scaler_x, 'wb') as fh:
+        fh.write(good)
+    assert reg.check() == ['a']
+    assert reg.get('a') is not old
+    assert np.allclose(_q(reg.get('a')), ref)
+    assert reg.stats()['a']['reloads'] == 1
+
+
+def test_handle_follows_reload():
+    reg, (model_path, _, _) = _registry()
+    handle = reg.handle('a')
+    old = reg.get('a')
+    os.utime(model_path, ns=(0, 0))
+    assert reg.check() == ['a']
+    assert handle.scaler_x is reg.get('a').scaler_x is not old.scaler_x
+
+
+if __name__ == "__main__":
+    test_corrupt_scaler_keeps_old_model()
+    test_handle_follows_reload()
+    print("registry ok")
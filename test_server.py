@@ -0,0 +1,73 @@
+import os
+import asyncio
+import tempfile
+import numpy as np
+from model_wrapper import MLQModel
+from server import MLQServer, _open, _post
+
+
+async def _with_server(model, client):
+    """Serve model on a temporary unix socket and run client(path) against it."""
+    path = os.path.join(tempfile.mkdtemp(), 'mlq.sock')
+    server = MLQServer(model, max_wait_ms=20.0)
+    task = asyncio.create_task(server.serve(unix_path=path))
+    try:
+        while not os.path.exists(path):
+            await asyncio.sleep(0.01)
+        return await client(path)
+    finally:
+        task.cancel()
+
+
+async def _request(path, endpoint, payload):
+    reader, writer = await _open(None, None, path)
+    try:
+        return await _post(reader, writer, endpoint, payload)
+    finally:
+        writer.close()
+
+
+def test_predict_matches_model():
+    model = MLQModel()
+    tws = [0.5, 1.0, 2.0, 4.0, 8.0]
+
+    async def client(path):
+        # concurrent requests share micro-batches
+        return await asyncio.gather(*[
+            _request(path, '/predict', {'freq': 400, 'R': 6, 'Lg': 5, 'Ll': 10, 'tw': tw}) for tw in tws])
+
+    responses = asyncio.run(_with_server(model, client))
+    assert all(status == 200 for status, _ in responses)
+    Q = np.array([body['Q'][0] for _, body in responses])
+    expected = model.predict_batch(trace_width=np.array(tws), frequency=400.0, R=6.0, Lg=5.0, Ll=10.0)
+    assert np.allclose(Q, expected)
+
+
+def test_optimize():
+    model = MLQModel()
+    status, body = asyncio.run(_with_server(model, lambda path: _request(
+        path, '/optimize', {'freq': 400, 'R': 6, 'Lg': 5, 'Ll': 10, 'topk': 10})))
+    assert status == 200
+    assert body['Q_max'] == max(q for _, q in body['top_k'])
+    assert body['topk_count'] == len(body['top_k'])
+
+
+def test_bad_requests():
+    async def client(path):
+        return [
+            await _request(path, '/predict', [1, 2]),
+            await _request(path, '/predict', {'freq': 400, 'R': 6, 'Lg': 5, 'Ll': 10}),
+            await _request(path, '/nope', {}),
+        ]
+
+    (s_list, e_list), (s_missing, _), (s_path, _) = asyncio.run(_with_server(MLQModel(), client))
+    assert s_list == 400 and 'JSON object' in e_list['error']
+    assert s_missing == 400
+    assert s_path == 404
+
+
+if __name__ == "__main__":
+    test_predict_matches_model()
+    test_optimize()
+    test_bad_requests()
+    print("server ok")
@@ -0,0 +1,42 @@
+import csv
+import os
+import tempfile
+from sweep import run_sweep
+
+# fallback analytic model: no model files needed
+AXES = [[300.0, 400.0, 500.0], [4.0, 6.0], [5.0], [8.0, 10.0]]
+
+
+def _read(path):
+    with open(path, newline='') as fh:
+        return list(csv.reader(fh))
+
+
+def test_resume_after_kill(tmp_dir=None):
+    tmp_dir = tmp_dir or tempfile.mkdtemp()
+    ref = os.path.join(tmp_dir, 'ref.csv')
+    out = os.path.join(tmp_dir, 'out.csv')
+    assert run_sweep(ref, {}, axes=AXES, workers=1, shard_size=3, progress=lambda msg: None) == 4
+    run_sweep(out, {}, axes=AXES, workers=1, shard_size=3, progress=lambda msg: None)
+
+    # a run killed after its first shard, mid-way through writing the second
+    with open(out + '.ckpt') as fh:
+        first = fh.readline()
+    with open(out + '.ckpt', 'w') as fh:
+        fh.write(first)
+    with open(out, 'r+') as fh:
+        fh.truncate(int(first.split()[1]))
+        fh.seek(0, os.SEEK_END)
+        fh.write('300.0,4.0,5.0,8.0,0.1')
+
+    assert run_sweep(out, {}, axes=AXES, workers=1, shard_size=3, progress=lambda msg: None) == 3
+    rows = _read(out)
+    assert len(rows) == 13
+    assert sorted(rows[1:]) == sorted(_read(ref)[1:])
+    # topk_count is written as an integer
+    assert all(r[-1].isdigit() for r in rows[1:])
+
+
+if __name__ == "__main__":
+    test_resume_after_kill()
+    print("sweep resume ok")